@@ -0,0 +1,76 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TURN_DEADLINE = 120
+
+_local = threading.local()
+
+
+def remaining_time(default):
+    """Seconds left before the current turn's deadline, capped at default.
+
+    Outside of an executor task there is no deadline and default is returned
+    unchanged, so agents can call this unconditionally.
+    """
+    deadline = getattr(_local, 'deadline', None)
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline - time.monotonic()))
+
+
+class AgentExecutor:
+    """Runs a batch of agent calls concurrently under a shared per-turn deadline"""
+
+    def __init__(self, max_workers=None, deadline=None):
+        self.max_workers = int(max_workers or os.environ.get('AGENT_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+        self.deadline = float(deadline or os.environ.get('AGENT_TURN_DEADLINE', DEFAULT_TURN_DEADLINE))
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='agent')
+        print(f"⚙️ Agent executor ready: {self.max_workers} workers, {self.deadline:.0f}s turn deadline")
+
+    def _run_task(self, deadline, fn, args):
+        """Run one agent with the turn deadline visible to remaining_time()"""
+        _local.deadline = deadline
+        try:
+            return fn(*args)
+        finally:
+            _local.deadline = None
+
+    def submit(self, fn, args, deadline=None):
+        """Start one agent call in the background under its own turn deadline; returns its Future"""
+        turn_deadline = time.monotonic() + (deadline or self.deadline)
+        return self.pool.submit(self._run_task, turn_deadline, fn, args)
+
+    def run(self, tasks, deadline=None):
+        """Run (name, fn, args) tasks and return {name: result} for those that finished.
+
+        Tasks still queued when the deadline passes are cancelled; tasks already
+        running are dropped from the result and their model calls time out at
+        the same deadline via remaining_time().
+        """
+        if not tasks:
+            return {}
+
+        turn_deadline = time.monotonic() + (deadline or self.deadline)
+        futures = {}
+        for name, fn, args in tasks:
+            future = self.pool.submit(self._run_task, turn_deadline, fn, args)
+            futures[future] = name
+
+        done, not_done = wait(futures, timeout=max(0.0, turn_deadline - time.monotonic()))
+
+        for future in not_done:
+            future.cancel()
+            print(f"⏱️ Dropping agent {futures[future]}: missed the turn deadline")
+
+        results = {}
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"❌ Agent {name} failed: {str(e)}")
+
+        return results
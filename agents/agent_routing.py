@@ -0,0 +1,335 @@
+import re
+from functools import lru_cache
+
+# Which chat specialists a turn's themes trigger, and the arguments each one
+# takes. "always" agents run on every turn. Keywords are matched after
+# normalisation and stemming, so "relationships" finds "relationship".
+AGENT_ROUTES = {
+    "therapy_agent": {"always": True, "args": ("entry", "emotions", "themes", "history")},
+    "casual_chat_agent": {"always": True, "args": ("entry", "history")},
+    "wellness_advisor_agent": {
+        "keywords": ["stress", "anxiety", "overwhelm", "pressure"],
+        "args": ("entry", "themes", "history")
+    },
+    "stress_management_agent": {
+        "keywords": ["stress", "anxiety", "overwhelm", "pressure"],
+        "args": ("entry", "emotions", "history")
+    },
+    "anxiety_management_agent": {
+        "keywords": ["stress", "anxiety", "overwhelm", "pressure"],
+        "args": ("entry", "emotions", "history")
+    },
+    "mindfulness_agent": {
+        "keywords": ["calm", "peace", "mindfulness", "meditation"],
+        "args": ("entry", "emotions", "history")
+    },
+    "meditation_guide_agent": {
+        "keywords": ["calm", "peace", "mindfulness", "meditation"],
+        "args": ("entry", "emotions", "history")
+    },
+    "coping_strategy_agent": {
+        "keywords": ["cope", "manage", "handle", "deal"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "cbt_agent": {
+        "keywords": ["thoughts", "thinking", "cognitive", "mind"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "self_care_agent": {
+        "keywords": ["self-care", "relax", "well-being"],
+        "args": ("entry", "emotions", "history")
+    },
+    "trauma_support_agent": {
+        "keywords": ["trauma", "support", "grounding"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "story_teller_agent": {
+        "keywords": ["story", "storytelling", "storyteller"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "poetry_agent": {
+        "keywords": ["poetry", "poem", "poetic"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "journal_prompt_agent": {
+        "keywords": ["journal", "journalism", "journalist"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "humor_agent": {
+        "keywords": ["humor", "funny", "joke"],
+        "args": ("entry", "emotions", "history")
+    },
+    "trivia_agent": {
+        "keywords": ["trivia", "fun fact", "fun trivia"],
+        "args": ("entry", "themes", "history")
+    },
+    "pop_culture_agent": {
+        "keywords": ["pop culture", "popular culture", "popular"],
+        "args": ("entry", "themes", "history")
+    },
+    "attack_support_agent": {
+        "keywords": ["attack", "support", "heal"],
+        "args": ("entry", "themes", "history")
+    },
+    "motivation_agent": {
+        "keywords": ["motivation", "inspire", "encouragement"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "gratitude_agent": {
+        "keywords": ["gratitude", "thankful", "appreciation"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "sleep_improvement_agent": {
+        "keywords": ["sleep", "insomnia", "rest", "tired"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "nutrition_agent": {
+        "keywords": ["nutrition", "food", "diet", "eating"],
+        "args": ("entry", "themes", "history")
+    },
+    "exercise_agent": {
+        "keywords": ["exercise", "fitness", "movement", "physical"],
+        "args": ("entry", "emotions", "history")
+    },
+    "relationship_advice_agent": {
+        "keywords": ["relationship", "partner", "friend", "family"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "career_guidance_agent": {
+        "keywords": ["career", "job", "work", "professional"],
+        "args": ("entry", "themes", "history")
+    },
+    "financial_wellness_agent": {
+        "keywords": ["money", "finance", "financial", "budget"],
+        "args": ("entry", "themes", "history")
+    },
+    "creativity_spark_agent": {
+        "keywords": ["creativity", "creative", "art", "expression"],
+        "args": ("entry", "emotions", "history")
+    },
+    "nature_connection_agent": {
+        "keywords": ["nature", "outdoors", "environment", "natural"],
+        "args": ("entry", "emotions", "history")
+    },
+    "philosophical_perspective_agent": {
+        "keywords": ["philosophy", "meaning", "purpose", "existential"],
+        "args": ("entry", "themes", "history")
+    },
+    "spiritual_guidance_agent": {
+        "keywords": ["spiritual", "spirit", "soul", "faith"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "time_management_agent": {
+        "keywords": ["time", "schedule", "planning", "productivity"],
+        "args": ("entry", "themes", "history")
+    },
+    "learning_strategy_agent": {
+        "keywords": ["learn", "learning", "education", "study"],
+        "args": ("entry", "themes", "history")
+    },
+    "habit_formation_agent": {
+        "keywords": ["habit", "routine", "consistency", "practice"],
+        "args": ("entry", "themes", "history")
+    },
+    "conflict_resolution_agent": {
+        "keywords": ["conflict", "argument", "disagreement", "fight"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "parenting_advice_agent": {
+        "keywords": ["parent", "child", "kid", "family"],
+        "args": ("entry", "themes", "history")
+    },
+    "positive_psychology_agent": {
+        "keywords": ["positive", "optimism", "happiness", "joy"],
+        "args": ("entry", "emotions", "history")
+    },
+    "emotional_intelligence_agent": {
+        "keywords": ["emotion", "feeling", "emotional", "awareness"],
+        "args": ("entry", "emotions", "history")
+    },
+    "social_skills_agent": {
+        "keywords": ["social", "interaction", "people", "group"],
+        "args": ("entry", "themes", "history")
+    },
+    "confidence_building_agent": {
+        "keywords": ["confidence", "self-esteem", "worth", "value"],
+        "args": ("entry", "emotions", "history")
+    },
+    "decision_making_agent": {
+        "keywords": ["decision", "choice", "option", "choose"],
+        "args": ("entry", "themes", "history")
+    },
+    "goal_setting_agent": {
+        "keywords": ["goal", "aim", "target", "objective"],
+        "args": ("entry", "themes", "history")
+    },
+    "resilience_building_agent": {
+        "keywords": ["resilience", "strength", "bounce back", "overcome"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "forgiveness_agent": {
+        "keywords": ["forgive", "forgiveness", "let go", "release"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "compassion_agent": {
+        "keywords": ["compassion", "kindness", "empathy", "care"],
+        "args": ("entry", "emotions", "history")
+    },
+    "boundary_setting_agent": {
+        "keywords": ["boundary", "limit", "space", "respect"],
+        "args": ("entry", "themes", "history")
+    },
+    "communication_skills_agent": {
+        "keywords": ["communicate", "communication", "talk", "express"],
+        "args": ("entry", "themes", "history")
+    },
+    "anger_management_agent": {
+        "keywords": ["anger", "mad", "furious", "rage"],
+        "args": ("entry", "emotions", "history")
+    },
+    "grief_support_agent": {
+        "keywords": ["grief", "loss", "mourn", "bereavement"],
+        "args": ("entry", "emotions", "history")
+    },
+    "loneliness_support_agent": {
+        "keywords": ["lonely", "loneliness", "alone", "isolated"],
+        "args": ("entry", "emotions", "history")
+    },
+    "body_image_agent": {
+        "keywords": ["body", "appearance", "look", "weight"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "perfectionism_management_agent": {
+        "keywords": ["perfect", "perfectionism", "flawless", "ideal"],
+        "args": ("entry", "themes", "history")
+    },
+    "imposter_syndrome_agent": {
+        "keywords": ["imposter", "fraud", "fake", "undeserving"],
+        "args": ("entry", "emotions", "themes", "history")
+    },
+    "digital_wellbeing_agent": {
+        "keywords": ["digital", "technology", "screen", "online"],
+        "args": ("entry", "themes", "history")
+    },
+    "work_life_balance_agent": {
+        "keywords": ["work-life", "balance", "burnout", "overwork"],
+        "args": ("entry", "themes", "history")
+    },
+    "environmental_wellness_agent": {
+        "keywords": ["environment", "space", "surroundings", "home"],
+        "args": ("entry", "themes", "history")
+    }
+
+}
+
+# Other ways of saying a keyword, mapped to the keyword they should route like
+SYNONYMS = {
+    "anxious": "anxiety", "worry": "anxiety", "worried": "anxiety", "nervous": "anxiety", "panic": "anxiety",
+    "fear": "anxiety", "stressful": "stress", "pressured": "pressure",
+    "mindful": "mindfulness", "meditate": "meditation",
+    "coping": "cope", "managing": "manage", "handling": "handle",
+    "self care": "self-care", "selfcare": "self-care", "relaxation": "relax",
+    "wellbeing": "well-being", "well being": "well-being",
+    "poet": "poetry", "humour": "humor",
+    "motivated": "motivation", "inspired": "inspire", "inspiration": "inspire",
+    "grateful": "gratitude", "thanks": "gratitude",
+    "sleepy": "sleep", "exhausted": "tired", "exhaustion": "tired", "fatigue": "tired",
+    "workout": "exercise", "gym": "exercise",
+    "boyfriend": "partner", "girlfriend": "partner", "husband": "partner", "wife": "partner",
+    "spouse": "partner", "marriage": "partner", "friendship": "friend", "dating": "relationship",
+    "workplace": "work", "office": "work", "boss": "work", "coworker": "work", "colleague": "work",
+    "employment": "job", "debt": "money", "artistic": "art",
+    "religion": "faith", "religious": "faith", "prayer": "faith",
+    "procrastination": "productivity", "deadline": "schedule",
+    "exam": "study", "school": "education",
+    "argue": "argument", "arguing": "argument",
+    "children": "child", "happy": "happiness", "joyful": "joy",
+    "self worth": "worth", "self esteem": "self-esteem", "confident": "confidence", "insecure": "confidence",
+    "resilient": "resilience", "forgiving": "forgive",
+    "compassionate": "compassion", "kind": "kindness",
+    "communicating": "communicate",
+    "angry": "anger", "irritated": "anger", "grieving": "grief",
+    "isolation": "isolated", "perfectionist": "perfectionism", "impostor": "imposter",
+    "social media": "digital", "phone": "screen",
+    "burned out": "burnout", "burnt out": "burnout", "house": "home"
+}
+
+_SUFFIXES = ("ness", "ings", "ing", "ies", "ied", "es", "ed", "s")
+
+
+def stem(word):
+    """Strip one common English suffix, keeping at least three letters"""
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 3:
+            continue
+        if suffix in ("ies", "ied"):
+            return word[:-3] + "y"
+        if suffix == "es" and not word[:-2].endswith(("s", "x", "z", "ch", "sh")):
+            continue
+        if suffix == "s" and word.endswith("ss"):
+            continue
+        return word[:-len(suffix)]
+    return word
+
+
+def normalize(text):
+    """Lower-case a theme and reduce it to stemmed words separated by single spaces"""
+    words = re.sub(r"[^a-z0-9\s-]", " ", str(text).lower().replace("_", " ")).split()
+    return " ".join(stem(word) for word in words)
+
+
+@lru_cache(maxsize=4096)
+def theme_keys(theme):
+    """The index keys a theme is looked up under: the whole phrase, its word pairs and its words"""
+    words = normalize(theme).split()
+    keys = [" ".join(words)]
+    keys.extend(" ".join(pair) for pair in zip(words, words[1:]))
+    keys.extend(words)
+    return tuple(dict.fromkeys(key for key in keys if key))
+
+
+class AgentRouter:
+    """Routes a turn's themes to chat specialists through a precompiled index.
+
+    The registry's keywords (and their synonyms) are normalised once into an
+    inverted index from key to the agents it triggers. Routing a turn looks
+    up each theme's few keys, so its cost grows with the number of themes,
+    not the number of rules, and every agent appears once however many of
+    its keywords matched. Agents come back in registry order.
+    """
+
+    def __init__(self, routes=None, synonyms=None):
+        self.routes = routes or AGENT_ROUTES
+        self.order = list(self.routes)
+        self.always = [name for name, route in self.routes.items() if route.get("always")]
+        self.index = {}
+        for position, (name, route) in enumerate(self.routes.items()):
+            for keyword in route.get("keywords", ()):
+                self.index.setdefault(normalize(keyword), set()).add(position)
+        for synonym, keyword in (synonyms or SYNONYMS).items():
+            targets = self.index.get(normalize(keyword))
+            if targets:
+                self.index.setdefault(normalize(synonym), set()).update(targets)
+        self.index = {key: frozenset(positions) for key, positions in self.index.items()}
+
+    def explain(self, themes):
+        """Return {agent: [themes that triggered it]} for the turn, always-on agents included"""
+        matched = {}
+        for theme in themes or []:
+            for key in theme_keys(str(theme)):
+                for position in self.index.get(key, ()):
+                    matched.setdefault(position, [])
+                    if theme not in matched[position]:
+                        matched[position].append(theme)
+        routed = {name: [] for name in self.always}
+        for position in sorted(matched):
+            routed[self.order[position]] = matched[position]
+        return routed
+
+    def route(self, themes):
+        """Names of the agents the themes trigger, always-on agents first"""
+        return list(self.explain(themes))
+
+    def args_for(self, name, values):
+        """The positional arguments for agent name, picked from values by parameter name"""
+        return tuple(values[arg] for arg in self.routes[name]["args"])
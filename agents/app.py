@@ -1,11 +1,12 @@
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import os
 import time
 import sys
-import requests
+from llm_client import get_llm_client, LLMError, LLMConnectionError
 from chat_agent import ChatAgent
+from conversation_store import CursorMismatch
 from journal_agent import JournalAgent
 from word_drop_agent import WordDropAgent
 from would_you_rather_agent import WouldYouRatherAgent
@@ -28,6 +29,8 @@ memory_match_agent = MemoryMatchAgent()
 breathing_rhythm_agent = BreathingRhythmAgent()
 report_agent = ReportAgent()
 print("✅ Agents initialized successfully")
+# Probe Ollama and load the agents' models in the background; /api/ready reports when they are resident
+get_llm_client().warmup.start()
 print("="*70 + "\n")
 
 @app.route('/api/chat', methods=['POST'])
@@ -39,34 +42,48 @@ def chat():
     try:
         data = request.json
         message = data.get('message', '')
-        session_id = data.get('sessionId', 'unknown')
+        # Without a session id there is no conversation state to continue
+        session_id = data.get('sessionId')
         user_id = data.get('userId', 'unknown')
         chat_history = data.get('chatHistory', [])
+        cursor = None
         
         print(f"📌 Message received: {message}")
-        print(f"📌 Session ID: {session_id}")
+        print(f"📌 Session ID: {session_id or 'unknown'}")
         print(f"📌 User ID: {user_id}")
-        print(f"📌 Chat history length: {len(chat_history)} messages")
-        
-        # Log detailed chat history
-        if chat_history and len(chat_history) > 0:
-            print("📌 Complete chat history:")
-            for i, msg in enumerate(chat_history):
-                role = "User" if msg['role'] == 'USER' else "Assistant"
-                content = msg['content']
-                # Truncate long messages in the log
-                if len(content) > 50:
-                    content = content[:50] + "..."
-                print(f"   {i+1}. {role}: {content}")
-        
-        print(f"📌 Full message: {message}")
         
         if not message:
             print("❌ Error: Message is required")
             return jsonify({'error': 'Message is required'}), 400
         
+        # With a session id the server keeps the history: clients send only the
+        # new message and their cursor, or chatHistory to (re)seed the session
+        if session_id:
+            try:
+                if 'chatHistory' in data:
+                    chat_agent.reseed(session_id, chat_history)
+                    print(f"📌 Session reseeded with {len(chat_history)} messages")
+                cursor, chat_history = chat_agent.conversations.history(session_id, data.get('cursor'))
+                chat_history = chat_agent.memory.recall(session_id, cursor, chat_history)
+            except CursorMismatch as e:
+                print(f"⚠️ {str(e)}, asking the client to resend the history")
+                return jsonify({'error': 'Conversation out of sync', 'cursor': e.actual}), 409
+            print(f"📌 Session at message {cursor}, using the last {len(chat_history)}")
+        else:
+            print(f"📌 Chat history length: {len(chat_history)} messages")
+        
+        if data.get('stream'):
+            print("🔄 Streaming ChatAgent.chat_stream() as server-sent events...")
+            return Response(
+                stream_with_context(_stream_chat(message, session_id, user_id, chat_history, cursor, start_time)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         print("🔄 Calling ChatAgent.chat()...")
-        response = chat_agent.chat(message, session_id, user_id, chat_history)
+        response = chat_agent.chat(message, session_id, user_id, chat_history, cursor)
+        if session_id:
+            response['cursor'] = chat_agent.record_turn(session_id, message, response['messages'])
         
         end_time = time.time()
         time_taken = end_time - start_time
@@ -86,57 +103,64 @@ def chat():
         print("-"*50 + "\n")
         return jsonify({'error': str(e)}), 500
 
+def _sse(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_chat(message, session_id, user_id, chat_history, cursor, start_time):
+    """Relay ChatAgent.chat_stream() events to the client as they are produced"""
+    try:
+        for event, data in chat_agent.chat_stream(message, session_id, user_id, chat_history, cursor):
+            if event == 'done' and session_id:
+                data = dict(data, cursor=chat_agent.record_turn(session_id, message, data['messages']))
+            yield _sse(event, data)
+            if event == 'done':
+                time_taken = time.time() - start_time
+                print(f"✅ Chat response streamed successfully in {time_taken:.2f} seconds")
+                print(f"📊 Response: {data}")
+                print("-"*50 + "\n")
+    except Exception as e:
+        time_taken = time.time() - start_time
+        print(f"❌ Error streaming chat response after {time_taken:.2f} seconds: {str(e)}")
+        import traceback
+        print(f"❌ Traceback: {traceback.format_exc()}")
+        print("-"*50 + "\n")
+        yield _sse('error', {'error': str(e)})
+
 @app.route('/api/status', methods=['GET'])
 def status():
     print("\n" + "-"*50)
     print("ℹ️ STATUS ENDPOINT CALLED")
     
+    llm = get_llm_client()
+    
     try:
         # Check Ollama status
-        api_url = chat_agent.api_url.replace('/generate', '/models')
-        response = requests.get(api_url)
-        
-        if response.status_code == 200:
-            models = response.json().get('models', [])
-            model_names = [model.get('name') for model in models]
-            
-            # Check if our model is available
-            model_available = chat_agent.model in model_names
-            
-            status_info = {
-                'status': 'ok' if model_available else 'warning',
-                'ollama_status': 'running',
-                'available_models': model_names,
-                'current_model': chat_agent.model,
-                'model_available': model_available,
-                'api_url': chat_agent.api_url,
-                'mode': 'production'
-            }
-            
-            if not model_available:
-                status_info['warning'] = f"Model {chat_agent.model} is not available. Try pulling it with 'ollama pull {chat_agent.model}'"
-        else:
-            status_info = {
-                'status': 'warning',
-                'ollama_status': f'error: {response.status_code}',
-                'error_details': response.text,
-                'available_models': [],
-                'current_model': chat_agent.model,
-                'api_url': chat_agent.api_url,
-                'mode': 'production',
-                'troubleshooting': [
-                    "Make sure Ollama is running with 'ollama serve'",
-                    "Check if the API URL is correct",
-                    "Verify there are no firewall or network issues"
-                ]
-            }
-    except requests.exceptions.RequestException as e:
+        model_names = llm.list_models()
+        
+        # Check if our model is available
+        model_available = chat_agent.model in model_names
+        
+        status_info = {
+            'status': 'ok' if model_available else 'warning',
+            'ollama_status': 'running',
+            'available_models': model_names,
+            'current_model': chat_agent.model,
+            'model_available': model_available,
+            'api_url': llm.host,
+            'backends': llm.backends.stats()['backends'],
+            'mode': 'production'
+        }
+        
+        if not model_available:
+            status_info['warning'] = f"Model {chat_agent.model} is not available. Try pulling it with 'ollama pull {chat_agent.model}'"
+    except LLMConnectionError as e:
         status_info = {
             'status': 'warning',
             'ollama_status': f'connection error: {str(e)}',
             'available_models': [],
             'current_model': chat_agent.model,
-            'api_url': chat_agent.api_url,
+            'api_url': llm.host,
             'mode': 'production',
             'troubleshooting': [
                 "Make sure Ollama is running with 'ollama serve'",
@@ -145,12 +169,53 @@ def status():
                 f"Error details: {str(e)}"
             ]
         }
+    except LLMError as e:
+        status_info = {
+            'status': 'warning',
+            'ollama_status': f'error: {str(e)}',
+            'available_models': [],
+            'current_model': chat_agent.model,
+            'api_url': llm.host,
+            'mode': 'production',
+            'troubleshooting': [
+                "Make sure Ollama is running with 'ollama serve'",
+                "Check if the API URL is correct",
+                "Verify there are no firewall or network issues"
+            ]
+        }
     
     print(f"✅ Status check: {status_info}")
     print("-"*50 + "\n")
     
     return jsonify(status_info)
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once the startup probe found the backends and every model the agents use is loaded, 503 until then"""
+    warmup = get_llm_client().warmup.stats()
+    return jsonify(warmup), 200 if warmup['ready'] else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Expose LLM client counters for monitoring"""
+    llm = get_llm_client()
+    return jsonify({
+        'cache': llm.cache.stats(),
+        'singleflight': llm.inflight.stats(),
+        'scheduler': llm.scheduler.stats(),
+        'backends': llm.backends.stats(),
+        'prompts': llm.prompts.stats(),
+        'structured_output': llm.schemas.stats(),
+        'generation': llm.profiles.stats(),
+        'latency': llm.latency.stats(),
+        'warmup': llm.warmup.stats(),
+        'sessions': chat_agent.sessions.stats(),
+        'analysis': chat_agent.classifier.stats(),
+        'speculation': chat_agent.speculation.stats(),
+        'conversations': chat_agent.conversations.stats(),
+        'memory': chat_agent.memory.stats()
+    })
+
 @app.route('/api/transcribe', methods=['POST'])
 def transcribe():
     print("\n" + "-"*50)
@@ -293,6 +358,15 @@ def combined_analysis():
         print("-"*50 + "\n")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chat/route', methods=['POST'])
+def preview_chat_routing():
+    """Dry run of chat routing: the agents a list of themes would trigger, without generating anything"""
+    data = request.json or {}
+    themes = data.get('themes')
+    if not isinstance(themes, list) or not all(isinstance(theme, str) for theme in themes):
+        return jsonify({'error': 'themes must be a list of strings'}), 400
+    return jsonify(chat_agent.preview_routing(themes))
+
 @app.route('/api/chat/report', methods=['POST'])
 def generate_chat_report():
     print("\n" + "-"*50)
@@ -445,5 +519,6 @@ if __name__ == '__main__':
     print(f"📌 API will be available at http://localhost:{port}")
     print(f"📌 Using Ollama model: {chat_agent.model}")
     print(f"📌 Press Ctrl+C to stop the server")
+    print(f"📌 Development server; for production run: gunicorn -c gunicorn.conf.py app:app")
     print("\n" + "="*70)
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,84 @@
+"""Load generator for the agents' HTTP API, for comparing serving setups.
+
+Start a fake backend and the server under test, then run:
+
+    python bench_serving.py --url http://127.0.0.1:4000 --clients 32 --requests 400
+
+Each client posts /api/chat turns with its own session id and distinct
+messages, so the generation cache does not short-circuit the work, and
+carries the session cursor from one reply to the next. Prints
+throughput and latency percentiles.
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+
+MESSAGES = [
+    "I have been feeling stressed about work lately",
+    "I could not sleep last night and I feel tired",
+    "My friend did not reply to my messages and I feel anxious",
+    "I finally finished my project and I feel relieved",
+    "I keep arguing with my family about small things",
+    "I want to build a better morning routine"
+]
+
+
+def run_client(url, client_id, count, latencies, errors, lock):
+    # Start every run from an empty session, then continue it by cursor
+    session = {"chatHistory": []}
+    for turn in range(count):
+        body = json.dumps({
+            "message": f"{MESSAGES[(client_id + turn) % len(MESSAGES)]} ({client_id}-{turn})",
+            "sessionId": f"bench-{client_id}",
+            "userId": f"bench-{client_id}",
+            **session
+        }).encode('utf-8')
+        request = urllib.request.Request(
+            f"{url}/api/chat", data=body, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=300) as response:
+                session = {"cursor": json.loads(response.read())["cursor"]}
+            with lock:
+                latencies.append(time.monotonic() - started)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/chat throughput")
+    parser.add_argument('--url', default='http://127.0.0.1:4000')
+    parser.add_argument('--clients', type=int, default=32, help="concurrent clients")
+    parser.add_argument('--requests', type=int, default=400, help="total chat turns")
+    args = parser.parse_args()
+
+    latencies, errors, lock = [], [], threading.Lock()
+    per_client = max(1, args.requests // args.clients)
+    threads = [
+        threading.Thread(target=run_client, args=(args.url, i, per_client, latencies, errors, lock))
+        for i in range(args.clients)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    if not latencies:
+        print(f"❌ All {len(errors)} requests failed: {errors[:1]}")
+        sys.exit(1)
+    print(f"📊 {len(latencies)} ok, {len(errors)} failed in {elapsed:.1f}s: "
+          f"{len(latencies) / elapsed:.1f} req/s, "
+          f"p50 {latencies[len(latencies) // 2]:.2f}s, "
+          f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,950 +1,706 @@
-import json
 import os
 import time
 import sys
-import subprocess
 import random
+import queue
+import threading
+from llm_client import get_llm_client, LLMError, LLMTimeoutError, LLMConnectionError
+from agent_executor import AgentExecutor, remaining_time
+from llm_sessions import SessionContextStore
+from conversation_store import ConversationStore
+from conversation_memory import ConversationMemory
+from llm_prompts import build_prompt, format_history
+from agent_routing import AgentRouter
+from lexicon_classifier import LexiconClassifier
+from chat_speculation import Speculation, SpeculationCancelled, SpeculationTracker, materially_differs
 
 class ChatAgent:
     def __init__(self):
         # Use mistral:latest as specified
         self.model = "mistral:latest"
+        self.llm = get_llm_client()
+        self.llm.warmup.register(self.model)
+        self.executor = AgentExecutor()
+        
+        # Reply composition: the primary agent's answer comes first, followed by
+        # this many randomly picked secondary agents (0 = primary only)
+        self.primary_agent = "therapy_agent"
+        self.secondary_responses = int(os.environ.get('CHAT_SECONDARY_RESPONSES', 0))
+        
+        # Theme -> specialist index, compiled once from agent_routing.AGENT_ROUTES
+        self.router = AgentRouter()
+        
+        # Lexicon fast path for the analysis stage; ambiguous turns go to the model
+        self.classifier = LexiconClassifier()
+        
+        # When the model has to analyse a turn, the primary agent starts from
+        # the lexicons' provisional analysis instead of waiting (CHAT_SPECULATIVE=0 disables)
+        self.speculation = SpeculationTracker()
+        
+        # Set per worker thread while an agent's tokens are being streamed
+        self._stream_local = threading.local()
+        
+        # Ollama conversation state per chat session, and the turn's snapshot of
+        # it as seen by the agents running on each worker thread
+        self.sessions = SessionContextStore()
+        self._session_local = threading.local()
+        
+        # Chat history per session, so clients only send the new message, and a
+        # rolling summary of what has scrolled out of its window
+        self.conversations = ConversationStore()
+        self.memory = ConversationMemory(self.conversations, self.summarize_conversation)
         
         print(f"🚀 Initializing Multi-Agent ChatAgent with model: {self.model}")
         print(f"🤖 Multiple specialized agents will collaborate to generate responses")
-        
-        # Check if Ollama is installed and the model is available
-        self._check_ollama_status()
-    def _check_ollama_status(self):
-        """Simulate checking Ollama status without making actual API calls"""
-        print("🔍 Checking Ollama installation")
-        try:
-            result = subprocess.run(
-                ['ollama', 'list'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                output = result.stdout.decode('utf-8')
-                print(f"✅ Ollama is installed and running")
-                print(f"📋 Available models: {output.strip()}")
-                
-                if self.model not in output:
-                    print(f"⚠️ Model {self.model} might not be available. Please ensure it's pulled.")
-                else:
-                    print(f"✅ Model {self.model} appears to be available")
-            else:
-                error = result.stderr.decode('utf-8')
-                print(f"⚠️ Warning: Ollama CLI returned error: {error}")
-        except Exception as e:
-            print(f"⚠️ Warning: Error checking Ollama status: {str(e)}")
-            print(f"⚠️ Make sure Ollama is installed and in your PATH")
     
-    def ollama_generate(self, prompt, history=None):
-        """Generate a response using Ollama CLI"""
+    def ollama_generate(self, prompt, history=None, agent=None, inputs=None):
+        """Generate a response using the shared Ollama HTTP client.
+
+        prompt holds the agent's static instructions and inputs the per-call
+        values ({"Input": entry, ...}); build_prompt lays them out so the
+        unchanging text comes first. agent labels the caller for caching and
+        metrics.
+        """
         try:
-            print(f"🔄 Calling Ollama CLI with model {self.model}")
+            print(f"🔄 Calling Ollama API with model {self.model}")
             
-            # Format history if provided
-            history_text = ""
-            if history and len(history) > 0:
-                for turn in history[-6:]:  # Use last 6 turns for context
-                    role = "User" if turn['role'] == 'USER' else "Assistant"
-                    history_text += f"{role}: {turn['content']}\n"
+            # Inside a session the model already holds the conversation, so
+            # only the new prompt is sent along with the stored context
+            context = getattr(self._session_local, 'context', None)
+            store_as = getattr(self._session_local, 'store_as', None)
             
-            full_prompt = f"""
-Here is the recent conversation:
-
-{history_text}
-
-Now based on the current input:
-
-{prompt}
-"""
+            history_text = "" if context else format_history(history)
+            full_prompt = build_prompt(prompt, inputs, history_text)
             
-            # Call Ollama CLI
-            result = subprocess.run(
-                ['ollama', 'run', self.model],
-                input=full_prompt.encode('utf-8'),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=120
-            )
+            # Inside a fan-out the call may not outlive the turn deadline
+            timeout = remaining_time(120)
+            if timeout <= 0:
+                raise LLMTimeoutError("Turn deadline already passed")
             
-            if result.returncode == 0:
-                response = result.stdout.decode('utf-8').strip()
-                print(f"✅ Generated response ({len(response)} chars)")
-                return response
+            on_token = getattr(self._stream_local, 'on_token', None)
+            if context or store_as:
+                response, new_context = self.llm.generate_with_context(
+                    self.model, full_prompt, context=context, timeout=timeout, agent=agent, on_token=on_token
+                )
+                if store_as and new_context:
+                    store_as(new_context)
+            elif on_token:
+                chunks = []
+                stream = self.llm.generate_stream(self.model, full_prompt, timeout=timeout, agent=agent)
+                try:
+                    for chunk in stream:
+                        chunks.append(chunk)
+                        on_token(chunk)
+                finally:
+                    stream.close()
+                response = "".join(chunks).strip()
             else:
-                error = result.stderr.decode('utf-8')
-                print(f"❌ Ollama CLI error: {error}")
-                return f"I'm sorry, I encountered an issue while processing your request. Error: {error}"
+                response = self.llm.generate(self.model, full_prompt, timeout=timeout, agent=agent)
+            print(f"✅ Generated response ({len(response)} chars)")
+            return response
                 
-        except subprocess.TimeoutExpired:
-            print("❌ Ollama process timed out after 120 seconds")
+        except SpeculationCancelled:
+            raise
+        except LLMTimeoutError:
+            print(f"❌ Ollama request timed out after {timeout:.0f} seconds")
             return "I'm sorry, it's taking me longer than expected to respond. Could you try again with a simpler question?"
+        except LLMConnectionError as e:
+            print(f"❌ Error calling Ollama: {str(e)}")
+            return f"I'm sorry, I'm having trouble connecting to the language model. Error: {str(e)}"
+        except LLMError as e:
+            print(f"❌ Ollama API error: {str(e)}")
+            return f"I'm sorry, I encountered an issue while processing your request. Error: {str(e)}"
         except Exception as e:
             print(f"❌ Error calling Ollama: {str(e)}")
             return f"I'm sorry, I'm having trouble connecting to the language model. Error: {str(e)}"
     
+    def ollama_generate_json(self, prompt, history=None, agent=None, inputs=None):
+        """Generate a JSON answer validated against the agent's output schema.
+
+        Prompts are laid out as in ollama_generate, but failures are raised
+        as LLMError (LLMOutputError for malformed output) so each caller can
+        fall back to its own defaults.
+        """
+        print(f"🔄 Calling Ollama API with model {self.model} for structured {agent} output")
+        context = getattr(self._session_local, 'context', None)
+        history_text = "" if context else format_history(history)
+        full_prompt = build_prompt(prompt, inputs, history_text)
+        
+        # Inside a fan-out the call may not outlive the turn deadline
+        timeout = remaining_time(120)
+        if timeout <= 0:
+            raise LLMTimeoutError("Turn deadline already passed")
+        
+        return self.llm.generate_json(self.model, full_prompt, agent, timeout=timeout, context=context)
+    
     # Agent 1: Emotion Detector
     def emotion_detector(self, entry, history):
-        prompt = f"""
+        prompt = """
 You are an emotion detection expert. Analyze the following user input and identify the primary emotions expressed. Return a JSON object with a list of emotions (e.g., ["sad", "stressed"]).
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
 
-Respond ONLY with JSON: {{ "emotions": ["emotion1", "emotion2", ...] }}
+Respond ONLY with JSON: { "emotions": ["emotion1", "emotion2", ...] }
 """
         try:
-            response = self.ollama_generate(prompt, history=history)
-            # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            return {"emotions": ["neutral"]}
-        except:
-            print("❌ Error parsing emotion detector response")
+            return self.ollama_generate_json(prompt, history=history, agent="emotion_detector", inputs={"Input": entry})
+        except LLMError as e:
+            print(f"❌ Error getting emotion detector response: {str(e)}")
             return {"emotions": ["neutral"]}
 
     # Agent 2: Theme Extractor
     def theme_extractor(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a mental health analyst. Extract key emotional and mental themes from this user input, considering the detected emotions.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Emotions: {emotions}
 
-Respond ONLY with JSON: {{ "themes": ["theme1", "theme2", ...] }}
+Respond ONLY with JSON: { "themes": ["theme1", "theme2", ...] }
 """
         try:
-            response = self.ollama_generate(prompt, history=history)
-            # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            return {"themes": ["general"]}
-        except:
-            print("❌ Error parsing theme extractor response")
+            return self.ollama_generate_json(prompt, history=history, agent="theme_extractor", inputs={"Input": entry, "Emotions": emotions})
+        except LLMError as e:
+            print(f"❌ Error getting theme extractor response: {str(e)}")
             return {"themes": ["general"]}
 
+    # Agents 1+2: Fused emotion and theme analysis in a single generation
+    def analysis_agent(self, entry, history):
+        prompt = """
+You are an emotion detection expert and mental health analyst. Analyze the following user input, identify the primary emotions expressed (e.g., ["sad", "stressed"]) and extract the key emotional and mental themes, considering those emotions.
+
+Respond ONLY with JSON: { "emotions": ["emotion1", "emotion2", ...], "themes": ["theme1", "theme2", ...] }
+"""
+        analysis = {"emotions": ["neutral"], "themes": ["general"]}
+        try:
+            parsed = self.ollama_generate_json(prompt, history=history, agent="analysis", inputs={"Input": entry})
+            if parsed["emotions"]:
+                analysis["emotions"] = parsed["emotions"]
+            if parsed["themes"]:
+                analysis["themes"] = parsed["themes"]
+            return analysis
+        except LLMError as e:
+            print(f"❌ Error getting analysis agent response: {str(e)}")
+            return analysis
+
     # Agent 3: Therapy Agent
     def therapy_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a compassionate therapist. Provide a supportive, empathetic response to the user's input, addressing their emotions and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise, empathetic message (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="therapy_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 4: Casual Chat Agent
     def casual_chat_agent(self, entry, history):
-        prompt = f"""
+        prompt = """
 You are a friendly, casual companion. Respond to the user's input with a lighthearted, engaging message. Keep it conversational and fun.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-IMPORTANT: Provide ONLY ONE short message. Do not give multiple options, variations, or alternatives.
 
-Input: "{entry}"
+IMPORTANT: Provide ONLY ONE short message. Do not give multiple options, variations, or alternatives.
 
 Respond with a SINGLE short, friendly message.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="casual_chat_agent", inputs={"Input": entry})
 
     # Agent 5: Wellness Advisor
     def wellness_advisor_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a wellness coach. Provide practical wellness advice (e.g., relaxation techniques, self-care tips) based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI. Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise, actionable suggestion.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="wellness_advisor_agent", inputs={"Input": entry, "Themes": themes})
 
     # Agent 6: Mindfulness Agent
     def mindfulness_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a mindfulness guide. Offer a brief mindfulness exercise (e.g., breathing, grounding technique) tailored to the user's emotions.
-Try to be as human as possible don't say you are computer generated or AI.Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a short, guided exercise (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="mindfulness_agent", inputs={"Input": entry, "Emotions": emotions})
 
     # Agent 7: Coping Strategy Agent
     def coping_strategy_agent(self, entry, emotions, themes, history):
-        prompt = f"""
-You are a mental health coach specializing in coping strategies. Ask user what makes them feel that specific way and then provide a specific, practical coping technique for the user's emotions and themes.Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
-Try to be as human as possible don't say you are computer generated or AI.
+        prompt = """
+You are a mental health coach specializing in coping strategies. Ask user what makes them feel that specific way and then provide a specific, practical coping technique for the user's emotions and themes.
+
 Respond with a concise, actionable coping strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="coping_strategy_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 8: CBT Agent
     def cbt_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a CBT therapist. Offer a cognitive-behavioral therapy technique (e.g., reframing negative thoughts) tailored to the user's emotions and themes.
-Try to be as human as possible don't say you are computer generated or AI.Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise CBT-based suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="cbt_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 9: Self Care Agent
     def self_care_agent(self, entry, emotions, history):
-        prompt = f"""
-You are a self-care advocate. Suggest a self-care activity to promote relaxation or well-being based on the user's input and emotions.Try to be as human as possible don't say you are computer generated or AI.Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
+        prompt = """
+You are a self-care advocate. Suggest a self-care activity to promote relaxation or well-being based on the user's input and emotions.
 
 Respond with a short, soothing self-care suggestion.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="self_care_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 10: Trauma Support Agent
     def trauma_support_agent(self, entry, emotions, themes, history):
-        prompt = f"""
-You are a trauma-informed counselor. Provide a gentle, grounding technique or supportive message for the user's emotions and themes.Try to be as human as possible don't say you are computer generated or AI.Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
+        prompt = """
+You are a trauma-informed counselor. Provide a gentle, grounding technique or supportive message for the user's emotions and themes.
 
 Respond with a concise, trauma-sensitive suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="trauma_support_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 11: Story Teller Agent
     def story_teller_agent(self, entry, emotions, themes, history):
-        prompt = f"""
-You are a creative storyteller. Write a short, engaging story snippet (3-5 sentences) inspired by the user's input, emotions, and themes.Try to be as human as possible don't say you are computer generated or AI.Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
+        prompt = """
+You are a creative storyteller. Write a short, engaging story snippet (3-5 sentences) inspired by the user's input, emotions, and themes.
 
 Respond with a concise story snippet.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="story_teller_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 12: Poetry Agent
     def poetry_agent(self, entry, emotions, themes, history):
-        prompt = f"""
-You are a poet. Craft a short poem (4-6 lines) reflecting the user's emotions and themes. 
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
+        prompt = """
+You are a poet. Craft a short poem (4-6 lines) reflecting the user's emotions and themes.
 
 Respond with a concise poem.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="poetry_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 13: Journal Prompt Agent
     def journal_prompt_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a journaling coach. Suggest a reflective journal prompt tailored to the user's emotions and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise journal prompt (1-2 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="journal_prompt_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 14: Humor Agent
     def humor_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a comedian. Share a lighthearted joke or humorous comment based on the user's input and emotions.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a short, funny message.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="humor_agent", inputs={"Input": entry, "Emotions": emotions})
 
     # Agent 15: Trivia Agent
     def trivia_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a trivia enthusiast. Share a fun fact or trivia question related to the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise trivia fact or question.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="trivia_agent", inputs={"Input": entry, "Themes": themes})
 
     # Agent 16: Pop Culture Agent
     def pop_culture_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a pop culture expert. Offer a casual comment or recommendation about movies, music, or trends based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a short, relatable message.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="pop_culture_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 17: Attack Support Agent
     def attack_support_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a attack support agent. Offer a solution for the user to heal from the attack based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a short, relatable message.
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="attack_support_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 18: Motivation Agent
     def motivation_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a motivational coach. Provide an encouraging, uplifting message based on the user's input, emotions, and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise, motivational message (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="motivation_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 19: Gratitude Agent
     def gratitude_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a gratitude guide. Suggest a gratitude practice or perspective shift based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise gratitude-focused suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="gratitude_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 20: Sleep Improvement Agent
     def sleep_improvement_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a sleep specialist. Offer advice for improving sleep quality based on the user's input, emotions, and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise sleep improvement tip (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="sleep_improvement_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 21: Nutrition Agent
     def nutrition_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a nutrition coach. Suggest a healthy eating tip or food choice related to the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise nutrition suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="nutrition_agent", inputs={"Input": entry, "Themes": themes})
 
     # Agent 22: Exercise Agent
     def exercise_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a fitness coach. Recommend a simple exercise or movement practice based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise exercise suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="exercise_agent", inputs={"Input": entry, "Emotions": emotions})
 
     # Agent 23: Relationship Advice Agent
     def relationship_advice_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a relationship counselor. Offer perspective or advice on interpersonal relationships based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with concise relationship insight (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="relationship_advice_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
 
     # Agent 24: Career Guidance Agent
     def career_guidance_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a career coach. Provide professional development advice or perspective based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with concise career guidance (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="career_guidance_agent", inputs={"Input": entry, "Themes": themes})
 
     # Agent 25: Financial Wellness Agent
     def financial_wellness_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a financial wellness coach. Offer a simple financial tip or perspective based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise financial wellness suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="financial_wellness_agent", inputs={"Input": entry, "Themes": themes})
 
     # Agent 26: Creativity Spark Agent
     def creativity_spark_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a creativity coach. Suggest a creative activity or exercise based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise creative suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="creativity_spark_agent", inputs={"Input": entry, "Emotions": emotions})
 
     # Agent 27: Nature Connection Agent
     def nature_connection_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a nature guide. Suggest a way to connect with nature based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise nature connection suggestion (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="nature_connection_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 28: Meditation Guide Agent
     def meditation_guide_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a meditation teacher. Offer a brief meditation practice tailored to the user's emotional state and input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise meditation guidance (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="meditation_guide_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 29: Philosophical Perspective Agent
     def philosophical_perspective_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a philosophical guide. Offer a thoughtful perspective or insight from philosophy related to the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise philosophical insight (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="philosophical_perspective_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 30: Spiritual Guidance Agent
     def spiritual_guidance_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a spiritual guide. Offer a non-denominational spiritual perspective or practice related to the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise spiritual insight (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="spiritual_guidance_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 31: Time Management Agent
     def time_management_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a productivity coach. Suggest a time management technique or perspective based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise time management tip (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="time_management_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 32: Learning Strategy Agent
     def learning_strategy_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a learning coach. Suggest an effective learning strategy or technique based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise learning strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="learning_strategy_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 33: Habit Formation Agent
     def habit_formation_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a habit coach. Suggest a technique for building or breaking habits based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise habit formation strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="habit_formation_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 34: Conflict Resolution Agent
     def conflict_resolution_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a conflict resolution specialist. Offer a perspective or technique for resolving interpersonal conflict based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise conflict resolution strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="conflict_resolution_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 35: Parenting Advice Agent
     def parenting_advice_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a parenting coach. Offer a perspective or technique for positive parenting based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with concise parenting advice (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="parenting_advice_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 36: Stress Management Agent
     def stress_management_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a stress management specialist. Suggest a technique for managing stress based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise stress management technique (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="stress_management_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 37: Positive Psychology Agent
     def positive_psychology_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a positive psychology coach. Suggest a practice from positive psychology based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise positive psychology practice (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="positive_psychology_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 38: Emotional Intelligence Agent
     def emotional_intelligence_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are an emotional intelligence coach. Offer insight or a technique for developing emotional awareness based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise emotional intelligence insight (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="emotional_intelligence_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 39: Social Skills Agent
     def social_skills_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a social skills coach. Suggest a technique or perspective for improving social interactions based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise social skills tip (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="social_skills_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 40: Confidence Building Agent
     def confidence_building_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a confidence coach. Suggest a technique or perspective for building self-confidence based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise confidence-building strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="confidence_building_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 41: Decision Making Agent
     def decision_making_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a decision-making coach. Suggest a framework or technique for making better decisions based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise decision-making strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="decision_making_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 42: Goal Setting Agent
     def goal_setting_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a goal-setting coach. Suggest an effective approach to setting and achieving goals based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise goal-setting strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="goal_setting_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 43: Resilience Building Agent
     def resilience_building_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a resilience coach. Suggest a technique or perspective for building emotional resilience based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise resilience-building strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="resilience_building_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 44: Forgiveness Agent
     def forgiveness_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a forgiveness coach. Offer a perspective or technique for practicing forgiveness based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise forgiveness practice (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="forgiveness_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 45: Compassion Agent
     def compassion_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a compassion coach. Suggest a practice for developing self-compassion or compassion for others based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise compassion practice (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="compassion_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 46: Boundary Setting Agent
     def boundary_setting_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a boundaries coach. Suggest a technique or perspective for setting healthy boundaries based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise boundary-setting strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="boundary_setting_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 47: Communication Skills Agent
     def communication_skills_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a communication coach. Suggest a technique for improving communication based on the user's input and themes.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise communication tip (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="communication_skills_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 48: Assertiveness Agent
     def assertiveness_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are an assertiveness coach. Suggest a technique for being more assertive in communication based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise assertiveness strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="assertiveness_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 49: Anger Management Agent
     def anger_management_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are an anger management specialist. Suggest a technique for managing anger based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise anger management technique (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="anger_management_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 50: Anxiety Management Agent
     def anxiety_management_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are an anxiety management specialist. Suggest a technique for managing anxiety based on the user's input and emotional state.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise anxiety management technique (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="anxiety_management_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 51: Grief Support Agent
     def grief_support_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a grief counselor. Offer a supportive perspective or technique for processing grief based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise grief support message (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="grief_support_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 52: Addiction Recovery Agent
     def addiction_recovery_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are an addiction recovery specialist. Offer a supportive perspective or technique for recovery based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise recovery support message (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="addiction_recovery_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 53: Loneliness Support Agent
     def loneliness_support_agent(self, entry, emotions, history):
-        prompt = f"""
+        prompt = """
 You are a loneliness support specialist. Offer a perspective or technique for managing feelings of loneliness based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
 
 Respond with a concise loneliness support message (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="loneliness_support_agent", inputs={"Input": entry, "Emotions": emotions})
     
     # Agent 54: Body Image Agent
     def body_image_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are a body image coach. Offer a perspective or technique for developing a healthier relationship with one's body based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise body image support message (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="body_image_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 55: Perfectionism Management Agent
     def perfectionism_management_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a perfectionism coach. Suggest a technique for managing perfectionist tendencies based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise perfectionism management strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="perfectionism_management_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 56: Procrastination Management Agent
     def procrastination_management_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a procrastination coach. Suggest a technique for overcoming procrastination based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise procrastination management strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="procrastination_management_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 57: Imposter Syndrome Agent
     def imposter_syndrome_agent(self, entry, emotions, themes, history):
-        prompt = f"""
+        prompt = """
 You are an imposter syndrome coach. Offer a perspective or technique for managing imposter syndrome based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Emotions: {emotions}
-Themes: {themes}
 
 Respond with a concise imposter syndrome management strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="imposter_syndrome_agent", inputs={"Input": entry, "Emotions": emotions, "Themes": themes})
     
     # Agent 58: Digital Wellbeing Agent
     def digital_wellbeing_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a digital wellbeing coach. Suggest a technique for maintaining a healthy relationship with technology based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise digital wellbeing strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="digital_wellbeing_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 59: Work-Life Balance Agent
     def work_life_balance_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are a work-life balance coach. Suggest a technique for maintaining healthy boundaries between work and personal life based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise work-life balance strategy (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="work_life_balance_agent", inputs={"Input": entry, "Themes": themes})
     
     # Agent 60: Environmental Wellness Agent
     def environmental_wellness_agent(self, entry, themes, history):
-        prompt = f"""
+        prompt = """
 You are an environmental wellness coach. Suggest a way to improve one's living or working environment for better wellbeing based on the user's input.
-Try to be as human as possible don't say you are computer generated or AI.
-Make it fast and concise but it should fulfil the query.
-
-Input: "{entry}"
-Themes: {themes}
 
 Respond with a concise environmental wellness tip (2-3 sentences).
 """
-        return self.ollama_generate(prompt, history=history)
+        return self.ollama_generate(prompt, history=history, agent="environmental_wellness_agent", inputs={"Input": entry, "Themes": themes})
 
     def generate_chat_report(self, session_id, history):
         if not history or len(history) < 10:
@@ -954,7 +710,7 @@ Respond with a concise environmental wellness tip (2-3 sentences).
         user_entries = [msg['content'] for msg in history if msg.get('role') == 'USER']
         combined_text = "\n".join(user_entries)
 
-        prompt = f"""
+        prompt = """
 You are a chat summarizer. Summarize the full conversation below in a concise, structured way and it should be professional.
 Include:
 - Key emotions observed
@@ -968,11 +724,8 @@ Include:
 - mindfulness_score: (a score from 0-100 evaluating the user's awareness, reflection, and presence in their entry. it should be more on the calmer side as it should define the clarity of thought and how at peace the person is. )
 -Only return a raw JSON object. Do not include any explanation or commentary.
 
-Conversation:
-{combined_text}
-
 Respond ONLY in structured JSON format:
-{{
+{
   "summary": "...",
   "emotions": ["..."],
   "themes": ["..."],
@@ -981,221 +734,254 @@ Respond ONLY in structured JSON format:
   "intensity": "...",
   "trigger_or_catalyst": "...",
   "growth_opportunity": "..."
-}}
+}
 """
 
-        result = self.ollama_generate(prompt, history=history)
         try:
-            json_data = json.loads(result)
-        except Exception as e:
+            return self.ollama_generate_json(prompt, history=history, agent="chat_report", inputs={"Conversation": combined_text})
+        except LLMError as e:
             print(f"❌ Error parsing summary: {e}")
             return {"error": "Failed to parse summary"}
-
-        return json_data
+    
+    def _in_session(self, fn, context, store_as=None):
+        """Wrap an agent so its model calls continue from the session's context.
+
+        Every agent in a turn sees the same context snapshot; only the agent
+        wrapped with store_as (a callable, see context_sink) saves the context
+        Ollama returns, so the session's state follows the reply the user
+        actually sees.
+        """
+        def run(*args):
+            self._session_local.context = context
+            self._session_local.store_as = store_as
+            try:
+                return fn(*args)
+            finally:
+                self._session_local.context = None
+                self._session_local.store_as = None
+        return run
+    
+    def _with_tokens(self, fn, on_token):
+        """Wrap an agent so its model call streams each text piece to on_token"""
+        def run(*args):
+            self._stream_local.on_token = on_token
+            try:
+                return fn(*args)
+            finally:
+                self._stream_local.on_token = None
+        return run
+    
+    def analyze_turn(self, entry, history, context, session_id=None, on_token=None):
+        """Emotions and themes for a turn, and the turn's speculative primary reply if one was started.
+
+        Confident lexicon answers come back at once. Otherwise the model is
+        asked, and while it works the primary agent is started speculatively
+        (see speculate) if the lexicons found an emotion to start from; it
+        returns (analysis, speculation or None).
+        """
+        analysis = self.classifier.classify(entry)
+        if analysis is not None:
+            print("⚡ Analysis answered by the lexicon fast path")
+            return analysis, None
+        speculation = None
+        if self.speculation.enabled:
+            emotions, themes, _, _ = self.classifier.score(entry)
+            if emotions:
+                speculation = self.speculate(entry, emotions, themes, history, context, session_id, on_token)
+            else:
+                # A neutral guess would be rejected by almost any real analysis
+                self.speculation.record("skipped")
+        started = time.monotonic()
+        analysis = self._in_session(self.analysis_agent, context)(entry, history)
+        if speculation is not None:
+            speculation.analysis_seconds = time.monotonic() - started
+        return analysis, speculation
+    
+    def speculate(self, entry, emotions, themes, history, context, session_id=None, on_token=None):
+        """Start the primary agent in the background from the lexicons' provisional analysis"""
+        provisional = {"emotions": emotions, "themes": themes or ["general"]}
+        speculation = Speculation(provisional, on_token)
+        values = {"entry": entry, "emotions": provisional["emotions"], "themes": provisional["themes"], "history": history}
+        fn = self._with_tokens(getattr(self, self.primary_agent), speculation.token)
+        if session_id:
+            fn = self._in_session(fn, context, speculation.store)
+        speculation.future = self.executor.submit(fn, self.router.args_for(self.primary_agent, values))
+        self.speculation.record("started")
+        print(f"🔮 Speculating {self.primary_agent} on provisional emotions {provisional['emotions']}")
+        return speculation
+    
+    def settle(self, speculation, analysis):
+        """Keep the speculative reply unless the final analysis materially disagrees; returns whether it was kept"""
+        if materially_differs(speculation.provisional, analysis, self.classifier):
+            speculation.reject()
+            self.speculation.record("regenerated")
+            print(f"🔁 Analysis {analysis['emotions']} disagrees with {speculation.provisional['emotions']}, regenerating")
+            return False
+        speculation.keep()
+        self.speculation.record("kept", speculation.analysis_seconds)
+        print(f"✅ Keeping speculative {self.primary_agent} reply")
+        return True
+    
+    def collect(self, speculation, session_id=None, cursor=None):
+        """{primary agent: reply} for a kept speculation, storing its session context"""
+        try:
+            response = speculation.future.result(timeout=self.executor.deadline)
+        except Exception as e:
+            print(f"❌ Speculative {self.primary_agent} failed: {str(e)}")
+            self.speculation.record("failed")
+            return {}
+        if session_id and speculation.context:
+            self.context_sink(session_id, cursor)(speculation.context)
+        return {self.primary_agent: response}
+    
+    def session_context(self, session_id, chat_history, cursor=None):
+        """Return the stored Ollama context to continue this turn from, if any"""
+        if not session_id:
+            return None
+        if not chat_history:
+            # A fresh conversation must not inherit an old one's state
+            self.sessions.discard(session_id)
+            return None
+        return self.sessions.get(session_id, cursor)
+    
+    def context_sink(self, session_id, cursor=None):
+        """Callable storing the context of a turn that started at cursor.
+
+        record_turn adds the user's message and the reply, so the context
+        is stored for the cursor the session has after this turn.
+        """
+        after = None if cursor is None else cursor + 2
+        return lambda context: self.sessions.put(session_id, context, after)
+    
+    def reseed(self, session_id, messages):
+        """Replace a session's stored history with the client's copy, dropping its Ollama context if it changed"""
+        cursor, changed = self.conversations.reseed(session_id, messages)
+        if changed:
+            self.sessions.discard(session_id)
+        return cursor
+    
+    def record_turn(self, session_id, message, messages):
+        """Store the user's message and the reply shown to them; returns the session's new cursor"""
+        cursor = self.conversations.append(session_id, ("USER", message), ("ASSISTANT", messages[0]))
+        self.memory.note(session_id, cursor)
+        return cursor
+    
+    def summarize_conversation(self, summary, messages, max_words):
+        """Fold messages into a session's rolling summary; raises LLMError on failure"""
+        prompt = f"""
+You maintain the memory of an ongoing supportive conversation. Update the summary so far with the new messages.
+Keep what matters for continuing the conversation: the user's situation, feelings, people and events they mentioned, and advice already given.
+Write plain prose of at most {max_words} words. Respond ONLY with the updated summary.
+"""
+        inputs = {"Summary so far": summary or "(none yet)", "New messages": format_history(messages, turns=len(messages))}
+        return self.llm.generate(self.model, build_prompt(prompt, inputs), agent="conversation_summary")
+    
+    def session_tasks(self, selected, session_id, context, cursor=None):
+        """Bind the planned (name, fn, args) tasks to the session's context"""
+        if not session_id:
+            return selected
+        sink = self.context_sink(session_id, cursor)
+        return [
+            (name, self._in_session(fn, context, sink if name == self.primary_agent else None), args)
+            for name, fn, args in selected
+        ]
     
     # Main processing function
-    def process_user_input(self, user_input, chat_history=None):
+    def process_user_input(self, user_input, chat_history=None, session_id=None, cursor=None):
         print("\n" + "="*50)
         print(f"🔄 Processing user input with multi-agent system")
         print(f"📝 User input: {user_input}")
         
         # Track time for performance monitoring
         start_time = time.time()
+        context = self.session_context(session_id, chat_history, cursor)
         
-        # Step 1: Detect emotions
-        emotion_data = self.emotion_detector(user_input, chat_history)
-        emotions = emotion_data.get("emotions", ["neutral"])
+        # Steps 1-2: Detect emotions and extract themes (lexicons first, then one model call)
+        analysis, speculation = self.analyze_turn(user_input, chat_history, context, session_id)
+        emotions = analysis["emotions"]
+        themes = analysis["themes"]
         print(f"🔍 Detected emotions: {emotions}")
-        
-        # Step 2: Extract themes
-        theme_data = self.theme_extractor(user_input, emotions, chat_history)
-        themes = theme_data.get("themes", ["general"])
         print(f"🔍 Extracted themes: {themes}")
         
-        # Step 3: Generate responses from different agents
-        responses = []
-        
-        # Always include therapy and casual chat responses
-        therapy_response = self.therapy_agent(user_input, emotions, themes, chat_history)
-        casual_response = self.casual_chat_agent(user_input, chat_history)
+        # Step 3: Collect candidate agents triggered by the analysis
+        specialists = self.select_agents(user_input, emotions, themes, chat_history)
         
-        responses.append(therapy_response)
-        responses.append(casual_response)
+        # Step 4: Only run the agents whose output the reply actually uses
+        selected = self.plan_response(specialists)
+        skipped = len(specialists) - len(selected)
+        if skipped:
+            print(f"⏭️ Skipping {skipped} triggered agents not needed for this reply")
         
-        # Conditionally include other agent responses based on themes
-        if any(theme in ["stress", "anxiety", "overwhelm", "pressure"] for theme in themes):
-            responses.append(self.wellness_advisor_agent(user_input, themes, chat_history))
-            responses.append(self.stress_management_agent(user_input, emotions, chat_history))
-            responses.append(self.anxiety_management_agent(user_input, emotions, chat_history))
+        # A kept speculative reply stands in for the primary agent
+        tasks = self.session_tasks(selected, session_id, context, cursor)
+        kept = speculation is not None and self.settle(speculation, analysis)
+        if kept:
+            tasks = [task for task in tasks if task[0] != self.primary_agent]
         
-        if any(theme in ["calm", "peace", "mindfulness", "meditation"] for theme in themes):
-            responses.append(self.mindfulness_agent(user_input, emotions, chat_history))
-            responses.append(self.meditation_guide_agent(user_input, emotions, chat_history))
-        
-        if any(theme in ["cope", "manage", "handle", "deal"] for theme in themes):
-            responses.append(self.coping_strategy_agent(user_input, emotions, themes, chat_history))
-        
-        if any(theme in ["thoughts", "thinking", "cognitive", "mind"] for theme in themes):
-            responses.append(self.cbt_agent(user_input, emotions, themes, chat_history))
-
-        if any(theme in ["self-care", "relax", "well-being"] for theme in themes):
-            responses.append(self.self_care_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["trauma", "support", "grounding"] for theme in themes):
-            responses.append(self.trauma_support_agent(user_input, emotions, themes, chat_history))
-
-        if any(theme in ["story", "storytelling", "storyteller"] for theme in themes):
-            responses.append(self.story_teller_agent(user_input, emotions, themes, chat_history))
-
-        if any(theme in ["poetry", "poem", "poetic"] for theme in themes):
-            responses.append(self.poetry_agent(user_input, emotions, themes, chat_history))
-
-        if any(theme in ["journal", "journalism", "journalist"] for theme in themes):
-            responses.append(self.journal_prompt_agent(user_input, emotions, themes, chat_history))
-
-        if any(theme in ["humor", "funny", "joke"] for theme in themes):
-            responses.append(self.humor_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["trivia", "fun fact", "fun trivia"] for theme in themes):
-            responses.append(self.trivia_agent(user_input, themes, chat_history))
-
-        if any(theme in ["pop culture", "popular culture", "popular"] for theme in themes):
-            responses.append(self.pop_culture_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["attack", "support", "heal"] for theme in themes):
-            responses.append(self.attack_support_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["motivation", "inspire", "encouragement"] for theme in themes):
-            responses.append(self.motivation_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["gratitude", "thankful", "appreciation"] for theme in themes):
-            responses.append(self.gratitude_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["sleep", "insomnia", "rest", "tired"] for theme in themes):
-            responses.append(self.sleep_improvement_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["nutrition", "food", "diet", "eating"] for theme in themes):
-            responses.append(self.nutrition_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["exercise", "fitness", "movement", "physical"] for theme in themes):
-            responses.append(self.exercise_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["relationship", "partner", "friend", "family"] for theme in themes):
-            responses.append(self.relationship_advice_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["career", "job", "work", "professional"] for theme in themes):
-            responses.append(self.career_guidance_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["money", "finance", "financial", "budget"] for theme in themes):
-            responses.append(self.financial_wellness_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["creativity", "creative", "art", "expression"] for theme in themes):
-            responses.append(self.creativity_spark_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["nature", "outdoors", "environment", "natural"] for theme in themes):
-            responses.append(self.nature_connection_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["philosophy", "meaning", "purpose", "existential"] for theme in themes):
-            responses.append(self.philosophical_perspective_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["spiritual", "spirit", "soul", "faith"] for theme in themes):
-            responses.append(self.spiritual_guidance_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["time", "schedule", "planning", "productivity"] for theme in themes):
-            responses.append(self.time_management_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["learn", "learning", "education", "study"] for theme in themes):
-            responses.append(self.learning_strategy_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["habit", "routine", "consistency", "practice"] for theme in themes):
-            responses.append(self.habit_formation_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["conflict", "argument", "disagreement", "fight"] for theme in themes):
-            responses.append(self.conflict_resolution_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["parent", "child", "kid", "family"] for theme in themes):
-            responses.append(self.parenting_advice_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["positive", "optimism", "happiness", "joy"] for theme in themes):
-            responses.append(self.positive_psychology_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["emotion", "feeling", "emotional", "awareness"] for theme in themes):
-            responses.append(self.emotional_intelligence_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["social", "interaction", "people", "group"] for theme in themes):
-            responses.append(self.social_skills_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["confidence", "self-esteem", "worth", "value"] for theme in themes):
-            responses.append(self.confidence_building_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["decision", "choice", "option", "choose"] for theme in themes):
-            responses.append(self.decision_making_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["goal", "aim", "target", "objective"] for theme in themes):
-            responses.append(self.goal_setting_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["resilience", "strength", "bounce back", "overcome"] for theme in themes):
-            responses.append(self.resilience_building_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["forgive", "forgiveness", "let go", "release"] for theme in themes):
-            responses.append(self.forgiveness_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["compassion", "kindness", "empathy", "care"] for theme in themes):
-            responses.append(self.compassion_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["boundary", "limit", "space", "respect"] for theme in themes):
-            responses.append(self.boundary_setting_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["communicate", "communication", "talk", "express"] for theme in themes):
-            responses.append(self.communication_skills_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["anger", "mad", "furious", "rage"] for theme in themes):
-            responses.append(self.anger_management_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["grief", "loss", "mourn", "bereavement"] for theme in themes):
-            responses.append(self.grief_support_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["lonely", "loneliness", "alone", "isolated"] for theme in themes):
-            responses.append(self.loneliness_support_agent(user_input, emotions, chat_history))
-            
-        if any(theme in ["body", "appearance", "look", "weight"] for theme in themes):
-            responses.append(self.body_image_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["perfect", "perfectionism", "flawless", "ideal"] for theme in themes):
-            responses.append(self.perfectionism_management_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["imposter", "fraud", "fake", "undeserving"] for theme in themes):
-            responses.append(self.imposter_syndrome_agent(user_input, emotions, themes, chat_history))
-            
-        if any(theme in ["digital", "technology", "screen", "online"] for theme in themes):
-            responses.append(self.digital_wellbeing_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["work-life", "balance", "burnout", "overwork"] for theme in themes):
-            responses.append(self.work_life_balance_agent(user_input, themes, chat_history))
-            
-        if any(theme in ["environment", "space", "surroundings", "home"] for theme in themes):
-            responses.append(self.environmental_wellness_agent(user_input, themes, chat_history))
-        
-        # Filter out any non-string responses and select the best one
-        valid_responses = [r for r in responses if isinstance(r, str) and len(r.strip()) > 0]
+        # Step 5: Fan out to the selected agents concurrently under the turn deadline
+        print(f"🤖 Running {len(tasks)} agents (max {self.executor.max_workers} at a time)")
+        results = self.executor.run(tasks)
+        if kept:
+            results.update(self.collect(speculation, session_id, cursor))
         
         # Calculate time taken
         end_time = time.time()
         time_taken = end_time - start_time
         
-        print(f"✅ Generated {len(valid_responses)} responses in {time_taken:.2f} seconds")
+        print(f"✅ Generated {len(results)} responses in {time_taken:.2f} seconds")
         print("="*50 + "\n")
         
-        # Select the best response - for now, we'll use the therapy response as primary
-        # and randomly select a secondary response if available
-        primary_response = therapy_response if therapy_response and isinstance(therapy_response, str) else "I'm here to listen and support you."
-        
         # Format the response as required
         return {
-            "messages": [primary_response]
+            "messages": self.compose_messages(selected, results)
         }
     
-    def chat(self, message, session_id=None, user_id=None, chat_history=None):
+    def select_agents(self, entry, emotions, themes, history):
+        """Return the (name, fn, args) agent tasks triggered by the analysed input"""
+        values = {"entry": entry, "emotions": emotions, "themes": themes, "history": history}
+        return [
+            (name, getattr(self, name), self.router.args_for(name, values))
+            for name in self.router.route(themes)
+        ]
+    
+    def preview_routing(self, themes):
+        """Dry run of a turn's routing: which agents the themes trigger and which would be asked to reply"""
+        triggered = self.router.explain(themes)
+        others = [name for name in triggered if name != self.primary_agent]
+        return {
+            "themes": themes,
+            "triggered": [{"agent": name, "matched": matched} for name, matched in triggered.items()],
+            "primary": self.primary_agent,
+            "secondary_candidates": others if self.secondary_responses else [],
+            "secondary_responses": self.secondary_responses
+        }
+    
+    def plan_response(self, candidates):
+        """Pick the (name, fn, args) tasks whose output the reply will contain.
+
+        The primary agent is always planned; up to secondary_responses of the
+        other triggered agents are picked at random. Everything else is never
+        sent to the model.
+        """
+        primary = [task for task in candidates if task[0] == self.primary_agent]
+        others = [task for task in candidates if task[0] != self.primary_agent]
+        picks = random.sample(others, min(self.secondary_responses, len(others)))
+        return primary + picks
+    
+    def compose_messages(self, selected, results):
+        """Build the reply messages from the planned agents, primary first"""
+        primary_response = results.get(self.primary_agent)
+        if not primary_response or not isinstance(primary_response, str):
+            primary_response = "I'm here to listen and support you."
+        
+        messages = [primary_response]
+        for name, _, _ in selected:
+            response = results.get(name)
+            if name != self.primary_agent and isinstance(response, str) and len(response.strip()) > 0:
+                messages.append(response)
+        return messages
+    
+    def chat(self, message, session_id=None, user_id=None, chat_history=None, cursor=None):
         """Generate a chat response based on the message and optional chat history. Make it as fast as possible. But the data should be as accurate as possible."""
         print(f"💬 Generating chat response for message: {message}")
         if session_id:
@@ -1207,7 +993,7 @@ Respond ONLY in structured JSON format:
         if chat_history and len(chat_history) > 0:
             print(f"📜 Chat history ({len(chat_history)} messages):")
             for i, msg in enumerate(chat_history):
-                role = "User" if msg['role'] == 'USER' else "Assistant"
+                role = {"USER": "User", "SUMMARY": "Summary"}.get(msg['role'], "Assistant")
                 content = msg['content']
                 # Truncate long messages in the log
                 if len(content) > 100:
@@ -1219,4 +1005,55 @@ Respond ONLY in structured JSON format:
         print(f"💬 Current message: {message}")
         
         # Process the user input with the multi-agent system
-        return self.process_user_input(message, chat_history)
\ No newline at end of file
+        return self.process_user_input(message, chat_history, session_id, cursor)
+    
+    def chat_stream(self, message, session_id=None, user_id=None, chat_history=None, cursor=None):
+        """Yield (event, data) pairs for a chat turn as soon as each part is ready.
+
+        Events are "analysis" ({"emotions", "themes"}), one "token" per piece of
+        the primary agent's reply as Ollama produces it, and a final "done"
+        carrying the same {"messages": [...]} dict that chat() returns.
+        """
+        print(f"💬 Streaming chat response for message: {message}")
+        if session_id:
+            print(f"   Session ID: {session_id}")
+        
+        start_time = time.time()
+        context = self.session_context(session_id, chat_history, cursor)
+        
+        tokens = queue.Queue()
+        finished = object()
+        results = {}
+        
+        analysis, speculation = self.analyze_turn(message, chat_history, context, session_id, tokens.put)
+        yield "analysis", analysis
+        
+        specialists = self.select_agents(message, analysis["emotions"], analysis["themes"], chat_history)
+        selected = self.plan_response(specialists)
+        
+        # A kept speculative reply has been streaming into tokens all along
+        kept = speculation is not None and self.settle(speculation, analysis)
+        tasks = [
+            (name, self._with_tokens(fn, tokens.put) if name == self.primary_agent else fn, args)
+            for name, fn, args in self.session_tasks(selected, session_id, context, cursor)
+            if not (kept and name == self.primary_agent)
+        ]
+        
+        def run_turn():
+            try:
+                results.update(self.executor.run(tasks))
+                if kept:
+                    results.update(self.collect(speculation, session_id, cursor))
+            finally:
+                tokens.put(finished)
+        
+        threading.Thread(target=run_turn, daemon=True).start()
+        
+        while True:
+            token = tokens.get()
+            if token is finished:
+                break
+            yield "token", {"token": token}
+        
+        print(f"✅ Streamed chat response in {time.time() - start_time:.2f} seconds")
+        yield "done", {"messages": self.compose_messages(selected, results)}
@@ -0,0 +1,97 @@
+import os
+import threading
+from lexicon_classifier import valence
+
+
+class SpeculationCancelled(Exception):
+    """Raised into a speculative generation once its provisional analysis was rejected"""
+
+
+class Speculation:
+    """One turn's primary reply, started from a provisional analysis.
+
+    Tokens the reply produces are held back until the real analysis has
+    settled it: keep() releases them (and every later token) to on_token,
+    reject() makes the next token raise SpeculationCancelled so the
+    generation is abandoned. The Ollama context a session call returns is
+    held in .context until the turn decides whether to store it.
+    """
+
+    def __init__(self, provisional, on_token=None):
+        self.provisional = provisional
+        self.on_token = on_token
+        self.future = None
+        self.context = None
+        self.state = "pending"
+        self.analysis_seconds = 0.0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def token(self, piece):
+        with self._lock:
+            if self.state == "rejected":
+                raise SpeculationCancelled("Provisional analysis was rejected")
+            if self.state == "pending":
+                self._buffer.append(piece)
+            elif self.on_token:
+                self.on_token(piece)
+
+    def store(self, context):
+        self.context = context
+
+    def keep(self):
+        with self._lock:
+            self.state = "kept"
+            if self.on_token:
+                for piece in self._buffer:
+                    self.on_token(piece)
+            self._buffer = []
+
+    def reject(self):
+        with self._lock:
+            self.state = "rejected"
+            self._buffer = []
+
+
+def materially_differs(provisional, analysis, classifier):
+    """Whether the final analysis changes what the primary reply should respond to.
+
+    Themes only shade the reply, so only emotions are compared: the reply
+    stands if the two analyses share an emotion (after mapping the model's
+    names onto lexicon labels) or express the same overall valence.
+    """
+    before = classifier.canonical(provisional["emotions"])
+    after = classifier.canonical(analysis["emotions"])
+    if set(before) & set(after):
+        return False
+    return valence(before) != valence(after)
+
+
+class SpeculationTracker:
+    """Counts how speculative primary replies were settled, for monitoring"""
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('CHAT_SPECULATIVE', '1') not in ('0', 'false', 'no')
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {"skipped": 0, "started": 0, "kept": 0, "regenerated": 0, "failed": 0}
+        self._overlapped = 0.0
+
+    def record(self, outcome, overlapped=0.0):
+        """Count a speculation as skipped (no emotion to start from), started, kept, regenerated or failed"""
+        with self._lock:
+            self._counters[outcome] += 1
+            self._overlapped += overlapped
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            overlapped = self._overlapped
+        settled = counters["kept"] + counters["regenerated"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "keep_rate": round(counters["kept"] / settled, 3) if settled else 0.0,
+            "analysis_seconds_overlapped": round(overlapped, 2)
+        }
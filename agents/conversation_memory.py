@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SUMMARY_EVERY = 4
+DEFAULT_SUMMARY_WORDS = 150
+
+
+class ConversationMemory:
+    """Rolling summary of each session's messages that have left the history window.
+
+    Agents see the summary followed by every message it does not cover yet:
+    the store's recent window plus whatever has scrolled out of it since the
+    last update, at most window + 2 * every messages, however long the
+    conversation runs. Once `every` turns' worth of messages have scrolled
+    out of the window, a background worker folds them into the summary with
+    one model call (previous summary + those messages in, a new summary of
+    at most max_words out). A session far behind, e.g. after a reseed, is
+    caught up in chunks of the same size, so no single call grows either.
+    Failed updates are retried after the session's next turn.
+    """
+
+    def __init__(self, store, summarize, every=None, max_words=None):
+        self.store = store
+        self.summarize = summarize
+        self.every = int(every or os.environ.get('CONVERSATION_SUMMARY_EVERY', DEFAULT_SUMMARY_EVERY))
+        self.max_words = int(max_words or os.environ.get('CONVERSATION_SUMMARY_WORDS', DEFAULT_SUMMARY_WORDS))
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='memory')
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._counters = {"updates": 0, "messages_summarized": 0, "failures": 0, "superseded": 0}
+        self.last_error = None
+
+    @property
+    def chunk(self):
+        """Messages folded into the summary per update (a user message and a reply per turn)"""
+        return 2 * self.every
+
+    def recall(self, session_id, cursor, history):
+        """The history agents should see: a SUMMARY entry, then the messages it does not cover.
+
+        history is the store's recent window for the session at cursor; only
+        messages older than the window are read from the database.
+        """
+        if not cursor:
+            return history
+        summary, through = self.store.summary(session_id)
+        unsummarized = min(cursor - through, self.store.window + self.chunk)
+        if unsummarized <= len(history):
+            recent = history[len(history) - unsummarized:]
+        else:
+            recent = self.store.messages(session_id, cursor - unsummarized, cursor)
+        return [{"role": "SUMMARY", "content": summary}] + recent
+
+    def note(self, session_id, cursor):
+        """Schedule a summary update if enough messages have left the window since the last one"""
+        _, through = self.store.summary(session_id)
+        if cursor - self.store.window - through < self.chunk:
+            return
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._pending.add(session_id)
+        self.pool.submit(self._update, session_id)
+
+    def _update(self, session_id):
+        try:
+            while True:
+                summary, through = self.store.summary(session_id)
+                outside = self.store.cursor(session_id) - self.store.window
+                if outside - through < self.chunk:
+                    return
+                upto = through + self.chunk
+                read_at = time.time()
+                messages = self.store.messages(session_id, through, upto)
+                updated = self.summarize(summary, messages, self.max_words)
+                if not self.store.save_summary(session_id, updated, upto, through, read_at):
+                    with self._lock:
+                        self._counters["superseded"] += 1
+                    return
+                with self._lock:
+                    self._counters["updates"] += 1
+                    self._counters["messages_summarized"] += len(messages)
+        except Exception as e:
+            print(f"⚠️ Could not update the summary of session {session_id}: {str(e)}")
+            with self._lock:
+                self._counters["failures"] += 1
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                self._pending.discard(session_id)
+
+    def stats(self):
+        """Summary update counters, for monitoring"""
+        with self._lock:
+            counters = dict(self._counters)
+            pending = len(self._pending)
+        return {
+            "every_turns": self.every,
+            "max_words": self.max_words,
+            "pending": pending,
+            **counters,
+            "last_error": self.last_error
+        }
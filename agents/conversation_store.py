@@ -0,0 +1,225 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'conversations.db')
+DEFAULT_WINDOW = 6
+DEFAULT_CACHED_SESSIONS = 1024
+
+
+class CursorMismatch(Exception):
+    """The client's view of a conversation is not the one the server holds"""
+
+    def __init__(self, session_id, expected, actual):
+        super().__init__(f"Session {session_id} is at message {actual}, client sent cursor {expected}")
+        self.expected = expected
+        self.actual = actual
+
+
+class ConversationStore:
+    """Server-side chat history per session, so clients only send the new message.
+
+    Every message gets the next sequence number in its session; the
+    session's cursor is the number of the last one. A client passes the
+    cursor it was last given (or the number of messages it has stored for
+    the session) and the server supplies the recent window of history
+    itself. When the two disagree the client is told the server's cursor
+    and resends the session's history once to reseed it.
+
+    Messages live in SQLite (CONVERSATION_DB, WAL mode so every server
+    worker can share the file); the last `window` messages of recently used
+    sessions are also kept in memory and read from there while the
+    database has nothing newer. A rolling summary of each session's older
+    messages (see conversation_memory) is kept alongside them.
+    """
+
+    def __init__(self, path=None, window=None, cached_sessions=None):
+        self.path = path or os.environ.get('CONVERSATION_DB', DEFAULT_DB_PATH)
+        self.window = int(window or os.environ.get('CONVERSATION_WINDOW', DEFAULT_WINDOW))
+        self.cached_sessions = int(cached_sessions or os.environ.get('CONVERSATION_CACHED_SESSIONS', DEFAULT_CACHED_SESSIONS))
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL,"
+            " content TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, through_seq INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_reads": 0, "db_reads": 0, "reseeds": 0, "reseeds_unchanged": 0, "mismatches": 0, "appended": 0}
+        print(f"🗂️ Conversation store ready: {self.path}, {self.window}-message window")
+
+    def _load(self, session_id):
+        """(cursor, recent messages) for a session, from memory if current, else from the database"""
+        cursor = self._db.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        cached = self._cache.get(session_id)
+        if cached is not None and cached[0] == cursor:
+            self._cache.move_to_end(session_id)
+            self._counters["memory_reads"] += 1
+            return cached
+        rows = self._db.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, self.window)
+        ).fetchall()
+        recent = deque(({"role": role, "content": content} for role, content in reversed(rows)), maxlen=self.window)
+        self._counters["db_reads"] += 1
+        return self._remember(session_id, cursor, recent)
+
+    def _remember(self, session_id, cursor, recent):
+        self._cache[session_id] = (cursor, recent)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cached_sessions:
+            self._cache.popitem(last=False)
+        return cursor, recent
+
+    def history(self, session_id, cursor=None):
+        """Return (cursor, recent messages) for a session.
+
+        Raises CursorMismatch when cursor is given and the session has a
+        different number of messages.
+        """
+        with self._lock:
+            current, recent = self._load(session_id)
+            if cursor is not None and int(cursor) != current:
+                self._counters["mismatches"] += 1
+                raise CursorMismatch(session_id, int(cursor), current)
+            return current, list(recent)
+
+    def reseed(self, session_id, messages):
+        """Replace a session's stored history with the client's copy.
+
+        Only messages after the longest prefix the two copies share are
+        rewritten, and the summary is kept if it covers no other message, so
+        a client resending history the server already holds costs no
+        summary updates. Returns (new cursor, whether anything changed).
+        """
+        now = time.time()
+        rows = [
+            (session_id, seq, message['role'], message['content'], now)
+            for seq, message in enumerate(messages, start=1)
+        ]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._db.execute(
+                    "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+                ).fetchall()
+                shared = 0
+                for (role, content), row in zip(stored, rows):
+                    if (role, content) != (row[2], row[3]):
+                        break
+                    shared += 1
+                changed = not (shared == len(stored) == len(rows))
+                if changed:
+                    self._db.execute("DELETE FROM messages WHERE session_id = ? AND seq > ?", (session_id, shared))
+                    self._db.execute(
+                        "DELETE FROM summaries WHERE session_id = ? AND through_seq > ?", (session_id, shared)
+                    )
+                    self._db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?)", rows[shared:])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            recent = deque(({"role": r[2], "content": r[3]} for r in rows[-self.window:]), maxlen=self.window)
+            self._remember(session_id, len(rows), recent)
+            self._counters["reseeds" if changed else "reseeds_unchanged"] += 1
+            return len(rows), changed
+
+    def append(self, session_id, *messages):
+        """Add (role, content) messages to the end of a session; returns the new cursor"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                self._db.executemany(
+                    "INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                    [(session_id, cursor + i, role, content, now) for i, (role, content) in enumerate(messages, start=1)]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            cached = self._cache.get(session_id)
+            if cached is not None and cached[0] == cursor:
+                recent = cached[1]
+                recent.extend({"role": role, "content": content} for role, content in messages)
+                self._remember(session_id, cursor + len(messages), recent)
+            else:
+                self._cache.pop(session_id, None)
+            self._counters["appended"] += len(messages)
+            return cursor + len(messages)
+
+    def cursor(self, session_id):
+        """Sequence number of the session's last message (0 for an empty session)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def messages(self, session_id, after, upto):
+        """The session's messages with after < seq <= upto, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                (session_id, after, upto)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def summary(self, session_id):
+        """(summary text, seq of the last message it covers) for a session; ("", 0) if none"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, through_seq FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row if row else ("", 0)
+
+    def save_summary(self, session_id, summary, through, previous, read_at=None):
+        """Store a summary covering messages up to through, if the stored one still ends at previous.
+
+        With read_at (when the summarized messages were read) the summary is
+        also refused if a reseed has rewritten any of them since. Returns
+        False when another update (or a reseed) got there first.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT through_seq FROM summaries WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                current = row[0] if row else 0
+                stored = current == previous
+                if stored and read_at is not None:
+                    unchanged = self._db.execute(
+                        "SELECT COUNT(*) FROM messages WHERE session_id = ? AND seq > ? AND seq <= ? AND created_at <= ?",
+                        (session_id, previous, through, read_at)
+                    ).fetchone()[0]
+                    stored = unchanged == through - previous
+                if stored:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                        (session_id, summary, through, time.time())
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return stored
+
+    def stats(self):
+        """Read path and resync counters, for monitoring"""
+        with self._lock:
+            counters = dict(self._counters)
+            cached = len(self._cache)
+        return {"window": self.window, "cached_sessions": cached, **counters}
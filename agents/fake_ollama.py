@@ -0,0 +1,459 @@
+"""Deterministic stand-in for the Ollama server, for benchmarks and local testing.
+
+Run the server and point the agents at it:
+
+    python fake_ollama.py --port 11435 --token-rate 40 --latency 0.3
+    OLLAMA_HOST=127.0.0.1:11435 PATH=$PWD/fake_bin:$PATH python app.py
+
+It implements /api/generate, /api/chat, /api/tags and /api/ps and answers
+each agent's prompt with schema-correct scripted output. fake_bin/ollama is
+a CLI shim (list / run) that talks to the same server.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import zlib
+import argparse
+import threading
+import datetime
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_MODELS = ["mistral:latest", "llama3:latest"]
+
+EMOTIONS = ["sad", "stressed", "anxious", "hopeful", "tired", "calm", "frustrated", "grateful"]
+THEMES = ["stress", "work", "sleep", "relationship", "family", "anxiety", "self-care", "motivation"]
+
+REPLIES = [
+    "That sounds really heavy, and it makes sense you feel this way. Let's take it one small step at a time together.",
+    "Thank you for sharing that with me. What you're feeling is valid, and I'm here to listen whenever you need.",
+    "It's okay to slow down for a moment. Try one deep breath and notice what your body needs right now.",
+    "You're doing better than you think by naming what's going on. What would feel most supportive right now?"
+]
+
+
+def _pick(rng, items, count):
+    return rng.sample(items, min(count, len(items)))
+
+
+def _field(prompt, label, default):
+    """Pull a 'Label: value' line out of an agent prompt"""
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line.lower().startswith(label.lower() + ":"):
+            return line.split(":", 1)[1].strip() or default
+    return default
+
+
+def scripted_response(prompt, rng):
+    """Return the text a well-behaved model would produce for an agent's prompt"""
+    text = prompt.lower()
+
+    if "would you rather" in text:
+        match = re.search(r'Generate (\d+) "would you rather"', prompt)
+        count = int(match.group(1)) if match else 10
+        questions = [{
+            "id": f"q{i + 1}",
+            "option_a": f"Spend an hour journaling ({i + 1})",
+            "option_b": f"Spend an hour walking outside ({i + 1})",
+            "insight_a": "You process things by reflecting inward",
+            "insight_b": "You reset by moving and changing scenery"
+        } for i in range(count)]
+        return json.dumps({
+            "questions": questions,
+            "category": _field(prompt, "Category", "general"),
+            "title": "Everyday Wellbeing Choices",
+            "description": "Questions about how you recharge and cope"
+        })
+
+    if "memory matching game" in text:
+        difficulty = _field(prompt, "Difficulty level", "medium")
+        count = {"easy": 6, "medium": 8, "hard": 12}.get(difficulty, 8)
+        pairs = [{
+            "id": f"pair{i + 1}",
+            "concept": f"Concept {i + 1}",
+            "match": f"Meaning of concept {i + 1}",
+            "category": "Wellbeing"
+        } for i in range(count)]
+        return json.dumps({
+            "pairs": pairs,
+            "difficulty": difficulty,
+            "theme": _field(prompt, "Theme", "mindfulness"),
+            "title": "Wellbeing Concepts",
+            "description": "Match each concept with its meaning"
+        })
+
+    if "breathing exercise" in text:
+        return json.dumps({
+            "title": "Box Breathing",
+            "description": "Even counts of inhale, hold and exhale to settle the nervous system.",
+            "difficulty": _field(prompt, "Difficulty level", "beginner"),
+            "focus": _field(prompt, "Focus area", "relaxation"),
+            "duration": "5",
+            "pattern": {"inhale": "4", "hold1": "4", "exhale": "4", "hold2": "4"},
+            "instructions": ["Sit comfortably", "Breathe in for four", "Hold for four", "Breathe out for four"],
+            "benefits": ["Reduces stress", "Improves focus"],
+            "affirmations": ["I am calm", "I am present"]
+        })
+
+    if "paragraph about mental health" in text:
+        return json.dumps({
+            "paragraph": "Every small act of self-care adds up. Be patient with yourself as you grow. "
+                         "Rest is part of progress, and you deserve kindness from yourself.",
+            "difficulty": _field(prompt, "Difficulty level", "medium"),
+            "theme": _field(prompt, "The theme is", "general")
+        })
+
+    if "analyze the following journal entry" in text:
+        return json.dumps({
+            "summary": "You are reflecting on a demanding day and how it affected you.",
+            "emotions": _pick(rng, EMOTIONS, 3),
+            "themes": _pick(rng, THEMES, 3),
+            "insights": ["You notice your stress early", "You value rest", "You are honest with yourself"],
+            "recommendations": ["Take short breaks", "Keep journaling", "Plan one restful evening"],
+            "sentiment_score": round(rng.uniform(-0.5, 0.5), 2),
+            "affirmation": "I am allowed to take things one step at a time.",
+            "mindfulness_score": rng.randint(50, 90)
+        })
+
+    if "chat summarizer" in text:
+        return json.dumps({
+            "summary": "The conversation explored recent stress and ways to cope with it.",
+            "emotions": _pick(rng, EMOTIONS, 2),
+            "themes": _pick(rng, THEMES, 2),
+            "motivational_closing": "You are making real progress by talking this through.",
+            "mindfulness_score": str(rng.randint(50, 90)),
+            "intensity": str(rng.randint(2, 8)),
+            "trigger_or_catalyst": "A busy week at work left little time to rest.",
+            "growth_opportunity": "Noticing early signs of stress and pausing sooner."
+        })
+
+    if "analyzing user data" in text:
+        return json.dumps({
+            "greeting": "Welcome back, it's good to see you checking in.",
+            "personality_analysis": "reflective",
+            "current_emotion": rng.choice(EMOTIONS),
+            "progress": "You have been reflecting consistently.",
+            "self_awareness": {"score": rng.randint(50, 90), "comment": "You name your feelings clearly."},
+            "suggestion": "Keep a short evening wind-down routine.",
+            "affirmation": "I am growing every day."
+        })
+
+    wants_emotions = '"emotions"' in prompt
+    wants_themes = '"themes"' in prompt
+    if wants_emotions or wants_themes:
+        result = {}
+        if wants_emotions:
+            result["emotions"] = _pick(rng, EMOTIONS, 2)
+        if wants_themes:
+            result["themes"] = _pick(rng, THEMES, 2)
+        return json.dumps(result)
+
+    return rng.choice(REPLIES)
+
+
+class FakeOllamaConfig:
+    """Behaviour knobs shared by all request handlers"""
+
+    def __init__(self, models, token_rate, latency, jitter, error_rate, stall_rate, stall_seconds, seed,
+                 prompt_rate=0.0, slots=4, trailing_words=0, parallel=0, load_seconds=0.0):
+        self.models = models
+        self.load_seconds = load_seconds
+        self.load_lock = threading.Lock()
+        # Like OLLAMA_NUM_PARALLEL: further requests queue for a free slot
+        self.capacity = threading.Semaphore(parallel) if parallel else None
+        self.trailing_words = trailing_words
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.loaded = {}
+        # Prompts whose KV state is still cached, one per parallel slot
+        self.slots = deque(maxlen=slots)
+        self.slots_lock = threading.Lock()
+
+    def roll(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def first_token_delay(self):
+        with self.rng_lock:
+            return max(0.0, self.rng.gauss(self.latency, self.jitter))
+
+    def evaluate_prompt(self, words):
+        """Return how many prompt tokens need evaluating after prefix-cache reuse"""
+        with self.slots_lock:
+            cached = 0
+            for previous in self.slots:
+                shared = 0
+                for a, b in zip(words, previous):
+                    if a != b:
+                        break
+                    shared += 1
+                cached = max(cached, shared)
+            self.slots.append(words)
+        return len(words) - cached
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, body):
+        line = (json.dumps(body) + "\n").encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            models = [{"name": name, "model": name, "size": 4_000_000_000} for name in self.config.models]
+            self._send_json(200, {"models": models})
+        elif self.path == '/api/ps':
+            now = time.time()
+            running = [{"name": name, "model": name, "expires_at": datetime.datetime.fromtimestamp(expires).isoformat()}
+                       for name, expires in self.config.loaded.items() if expires > now]
+            self._send_json(200, {"models": running})
+        elif self.path == '/':
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+
+        if self.path == '/api/generate':
+            prompt, chat = body.get('prompt', ''), False
+        elif self.path == '/api/chat':
+            messages = body.get('messages', [])
+            prompt, chat = "\n".join(message.get('content', '') for message in messages), True
+        else:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        if self.config.capacity is None:
+            self._complete(body, prompt, chat)
+            return
+        with self.config.capacity:
+            self._complete(body, prompt, chat)
+
+    def _complete(self, body, prompt, chat):
+        config = self.config
+        model = body.get('model', '')
+        if model not in config.models and f"{model}:latest" not in config.models:
+            self._send_json(404, {"error": f"model '{model}' not found, try pulling it first"})
+            return
+
+        keep_alive = body.get('keep_alive', 300)
+        if isinstance(keep_alive, str):
+            # Durations like "10m"; anything else gets the default
+            units = {"s": 1, "m": 60, "h": 3600}
+            number, unit = keep_alive[:-1], keep_alive[-1:]
+            keep_alive = float(number) * units[unit] if unit in units and number.replace('.', '', 1).isdigit() else 300
+        name = model if ':' in model else f"{model}:latest"
+        with config.load_lock:
+            # A model that is not resident has to be loaded first
+            if config.loaded.get(name, 0) < time.time():
+                time.sleep(config.load_seconds)
+            config.loaded[name] = time.time() + max(0, keep_alive)
+
+        if config.roll() < config.error_rate:
+            self._send_json(500, {"error": "injected failure"})
+            return
+        if config.roll() < config.stall_rate:
+            time.sleep(config.stall_seconds)
+
+        # Same prompt, same answer: the generation is seeded from the prompt text
+        seed = hashlib.sha256(f"{config.seed}:{model}:{prompt}".encode('utf-8')).hexdigest()
+        text = scripted_response(prompt, random.Random(seed)) if prompt else ""
+        if config.trailing_words and text.startswith('{'):
+            # Like real models, keep talking after the JSON is complete
+            text += " I hope this helps!" + " Let me know if you need anything else." * (config.trailing_words // 8)
+
+        options = body.get('options') or {}
+        stop = options.get('stop') or []
+        cuts = [text.find(sequence) for sequence in stop if sequence and sequence in text]
+        if cuts:
+            text = text[:min(cuts)]
+        tokens = [piece + " " for piece in text.split(" ")] if text else []
+        if tokens:
+            tokens[-1] = tokens[-1].rstrip(" ")
+
+        num_predict = options.get('num_predict')
+        if isinstance(num_predict, int) and num_predict >= 0:
+            tokens = tokens[:num_predict]
+
+        started = time.time()
+        prompt_tokens = config.evaluate_prompt(prompt.split())
+        first_token = config.first_token_delay()
+        if config.prompt_rate > 0:
+            first_token += prompt_tokens / config.prompt_rate
+        per_token = 1.0 / config.token_rate if config.token_rate > 0 else 0.0
+
+        def final(extra):
+            elapsed = time.time() - started
+            done = {
+                "model": model,
+                "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+                "done": True,
+                "done_reason": "stop" if num_predict is None or len(tokens) < num_predict else "length",
+                "total_duration": int(elapsed * 1e9),
+                "load_duration": 0,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(first_token * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(max(0.0, elapsed - first_token) * 1e9)
+            }
+            if not chat:
+                # Like Ollama: the previous context plus this turn's prompt and reply tokens
+                turn = [zlib.crc32(word.encode('utf-8')) & 0x7fff for word in (prompt + " " + text).split()]
+                done["context"] = list(body.get('context') or []) + turn
+            done.update(extra)
+            return done
+
+        def piece(content):
+            if chat:
+                return {"message": {"role": "assistant", "content": content}}
+            return {"response": content}
+
+        if body.get('stream', True):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                time.sleep(first_token)
+                for token in tokens:
+                    time.sleep(per_token)
+                    self._write_chunk(dict(piece(token), model=model, done=False))
+                self._write_chunk(final(piece("")))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client hung up: that is how Ollama generation gets cancelled
+                self.close_connection = True
+            return
+
+        time.sleep(first_token + per_token * len(tokens))
+        self._send_json(200, final(piece("".join(tokens))))
+
+
+def run_cli(args):
+    """Minimal `ollama list` / `ollama run MODEL` against the fake server"""
+    import urllib.request
+
+    host = os.environ.get('OLLAMA_HOST', '127.0.0.1:11435')
+    if not host.startswith('http'):
+        host = f"http://{host}"
+
+    if not args or args[0] not in ('list', 'run'):
+        print("usage: ollama list | ollama run MODEL [PROMPT]", file=sys.stderr)
+        return 1
+
+    try:
+        if args[0] == 'list':
+            with urllib.request.urlopen(f"{host}/api/tags", timeout=10) as response:
+                models = json.loads(response.read())["models"]
+            print(f"{'NAME':<30}{'SIZE':>10}")
+            for model in models:
+                print(f"{model['name']:<30}{'4.1 GB':>10}")
+            return 0
+
+        if len(args) < 2:
+            print("Error: requires a model name", file=sys.stderr)
+            return 1
+        prompt = " ".join(args[2:]) if len(args) > 2 else sys.stdin.read()
+        request = urllib.request.Request(
+            f"{host}/api/generate",
+            data=json.dumps({"model": args[1], "prompt": prompt, "stream": False}).encode('utf-8'),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=600) as response:
+            print(json.loads(response.read())["response"])
+        return 0
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'cli':
+        sys.exit(run_cli(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarking the agents")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--models', default=",".join(DEFAULT_MODELS), help="comma-separated model names to advertise")
+    parser.add_argument('--token-rate', type=float, default=50.0, help="generated tokens per second (0 = instant)")
+    parser.add_argument('--prompt-rate', type=float, default=0.0,
+                        help="prompt tokens evaluated per second after prefix-cache reuse (0 = free)")
+    parser.add_argument('--trailing-words', type=int, default=0,
+                        help="roughly how many words of chatter follow every JSON answer")
+    parser.add_argument('--latency', type=float, default=0.2, help="mean seconds before the first token")
+    parser.add_argument('--jitter', type=float, default=0.05, help="standard deviation of the first-token latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument('--stall-rate', type=float, default=0.0, help="fraction of requests that stall before answering")
+    parser.add_argument('--stall-seconds', type=float, default=180.0, help="how long a stalled request hangs")
+    parser.add_argument('--load-seconds', type=float, default=0.0, help="how long loading a model that is not resident takes")
+    parser.add_argument('--parallel', type=int, default=0, help="requests generated at once, the rest queue (0 = unlimited)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    FakeOllamaHandler.config = FakeOllamaConfig(
+        models=[name.strip() for name in args.models.split(',') if name.strip()],
+        token_rate=args.token_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        seed=args.seed,
+        prompt_rate=args.prompt_rate,
+        trailing_words=args.trailing_words,
+        parallel=args.parallel,
+        load_seconds=args.load_seconds
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeOllamaHandler)
+    server.daemon_threads = True
+    print(f"🧪 Fake Ollama listening on http://{args.host}:{args.port}")
+    print(f"📌 Models: {', '.join(FakeOllamaHandler.config.models)}")
+    print(f"📌 {args.token_rate:g} tok/s, first token {args.latency:g}s ± {args.jitter:g}s, "
+          f"errors {args.error_rate:.0%}, stalls {args.stall_rate:.0%}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Fake Ollama stopped")
+
+
+if __name__ == '__main__':
+    main()
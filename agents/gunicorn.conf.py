@@ -0,0 +1,61 @@
+"""Production server settings for the agents API.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Preforked gthread workers, each serving GUNICORN_THREADS requests at once.
+Every worker imports app.py itself, so the agents and the LLM client
+(connection pool, caches, scheduler) are built once per worker. On SIGTERM
+a worker stops accepting connections, finishes its in-flight requests and
+then waits for any LLM calls still running before it exits, all within
+GUNICORN_GRACEFUL_TIMEOUT.
+
+`python app.py` still runs the Flask development server, with the
+reloader and debugger, for local work.
+
+Throughput of /api/chat (bench_serving.py, 32 clients, 320 turns) on one
+CPU against fake_ollama.py --parallel 16 --token-rate 100 with
+OLLAMA_NUM_PARALLEL=16:
+
+    python app.py (dev server)                     8.7 req/s  p50 3.60s  p95 3.92s
+    1 worker x 16 threads                          8.8 req/s  p50 3.58s  p95 3.79s
+    2 workers x 16 threads                        16.5 req/s  p50 1.57s  p95 2.83s
+    4 workers x 16 threads                        14.5 req/s  p50 1.47s  p95 3.65s
+    1 worker x 16 threads, AGENT_MAX_WORKERS=16   22.2 req/s  p50 1.39s  p95 1.54s
+
+The first four rows ran with the agent executor at its default of 4
+workers: a single process is bounded by its executor, not by the server,
+and more workers add executors but split the Ollama slots. Each worker
+therefore sizes its executor to GUNICORN_THREADS unless AGENT_MAX_WORKERS
+is set, as in the last row.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 4000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+worker_class = 'gthread'
+
+# The LLM client starts background threads (health checks, warm-up), which
+# do not survive a fork, so the app is imported in each worker instead
+preload_app = False
+
+# A chat turn can wait on several generations in a row
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 180))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 120))
+keepalive = 5
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    """Workers split the Ollama slots between them (see llm_client) and run
+    as many agent calls at once as they serve requests (see agent_executor)"""
+    os.environ['LLM_WORKERS'] = str(server.cfg.workers)
+    os.environ.setdefault('AGENT_MAX_WORKERS', str(server.cfg.threads))
+
+
+def worker_exit(server, worker):
+    """Give LLM calls that outlived their request time to finish before the worker goes"""
+    from llm_client import drain_llm_client
+    if not drain_llm_client(graceful_timeout):
+        server.log.warning("Worker %s exited with LLM calls still running", worker.pid)
@@ -1,8 +1,8 @@
-import subprocess
 import json
 import os
 import datetime
 import traceback
+from llm_client import get_llm_client, LLMError, LLMOutputError
 
 class JournalAgent:
     def __init__(self):
@@ -10,6 +10,8 @@ class JournalAgent:
         print("🚀 Starting Journal Analysis Agent")
         print("="*70)
         self.model = "mistral"
+        self.llm = get_llm_client()
+        self.llm.warmup.register(self.model)
         print(f"📌 Using Ollama model: {self.model}")
         
     def analyze_journal_entry(self, content, entry_id=None, user_id=None):
@@ -51,27 +53,12 @@ class JournalAgent:
             
             print(f"🔄 Calling Ollama with model {self.model}...")
             
-            # Call Ollama to analyze the journal entry
-            result = subprocess.run(
-                ["ollama", "run", self.model],
-                input=prompt,
-                text=True,
-                capture_output=True,
-                check=True,
-                timeout=60
-            )
-            
-            output = result.stdout.strip()
+            # Call Ollama to analyze the journal entry; the output is constrained
+            # to and validated against the journal schema, and the "journal"
+            # generation profile bounds its length and time
+            parsed = self.llm.generate_json(self.model, prompt, "journal")
             print(f"✅ Received response from Ollama")
             
-            # Extract JSON from the response
-            json_start = output.find('{')
-            if json_start == -1:
-                raise ValueError("No JSON found in Ollama response")
-                
-            json_output = output[json_start:]
-            parsed = json.loads(json_output)
-            
             # Log the analysis results
             print(f"📊 Analysis results:")
             print(f"  - Emotions: {', '.join(parsed.get('emotions', ['unknown'])[:3])}")
@@ -85,21 +72,19 @@ class JournalAgent:
             
             return parsed
             
-        except json.JSONDecodeError as e:
+        except LLMOutputError as e:
             end_time = datetime.datetime.now()
             time_taken = (end_time - start_time).total_seconds()
             print(f"❌ Error parsing JSON after {time_taken:.2f} seconds: {str(e)}")
-            print(f"❌ Raw output: {output if 'output' in locals() else 'No output'}")
             print("-"*50 + "\n")
             
             # Return a fallback analysis
             return self._generate_fallback_analysis(content)
             
-        except subprocess.CalledProcessError as e:
+        except LLMError as e:
             end_time = datetime.datetime.now()
             time_taken = (end_time - start_time).total_seconds()
-            print(f"❌ Ollama subprocess failed after {time_taken:.2f} seconds: {str(e)}")
-            print(f"❌ Error output: {e.stderr}")
+            print(f"❌ Ollama request failed after {time_taken:.2f} seconds: {str(e)}")
             print("-"*50 + "\n")
             
             # Return a fallback analysis
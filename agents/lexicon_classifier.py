@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import time
+import threading
+from agent_routing import stem
+
+# Keyword lexicons for emotions and themes, shared by the report keyword
+# extraction and the chat fast path. LEXICON_PATH may point to a JSON file
+# {"emotions": {label: [words]}, "themes": {label: [words]}} whose entries
+# are added at startup.
+EMOTION_LEXICON = {
+    "happy": ["happy", "joy", "delighted", "pleased", "content", "satisfied"],
+    "sad": ["sad", "unhappy", "depressed", "down", "blue", "gloomy"],
+    "angry": ["angry", "mad", "furious", "irritated", "annoyed", "frustrated"],
+    "anxious": ["anxious", "worried", "nervous", "uneasy", "concerned", "stressed"],
+    "calm": ["calm", "peaceful", "relaxed", "serene", "tranquil", "composed"],
+    "excited": ["excited", "thrilled", "enthusiastic", "eager", "animated"],
+    "tired": ["tired", "exhausted", "fatigued", "drained", "sleepy"],
+    "grateful": ["grateful", "thankful", "appreciative", "blessed"],
+    "confused": ["confused", "puzzled", "perplexed", "uncertain", "unsure"],
+    "hopeful": ["hopeful", "optimistic", "positive", "encouraged"],
+    "overwhelmed": ["overwhelmed", "swamped", "overloaded", "burdened"],
+    "proud": ["proud", "accomplished", "satisfied", "fulfilled"]
+}
+
+THEME_LEXICON = {
+    "work": ["work", "job", "career", "office", "professional", "colleague"],
+    "relationships": ["relationship", "friend", "family", "partner", "spouse", "love"],
+    "health": ["health", "wellness", "exercise", "diet", "sleep", "medical"],
+    "personal growth": ["growth", "improvement", "learning", "development", "progress"],
+    "stress": ["stress", "pressure", "tension", "overwhelm", "burnout"],
+    "self-care": ["self-care", "relax", "rest", "recharge", "break", "me time"],
+    "mindfulness": ["mindful", "present", "aware", "conscious", "meditation"],
+    "goals": ["goal", "objective", "target", "aim", "aspiration", "achievement"],
+    "creativity": ["creative", "art", "write", "music", "express", "imagination"],
+    "balance": ["balance", "harmony", "equilibrium", "stability"],
+    "change": ["change", "transition", "shift", "adjust", "adapt"],
+    "gratitude": ["gratitude", "thankful", "appreciate", "blessing"]
+}
+
+# Words the chat classifier also knows but the report keyword counts leave
+# out: chat turns thank the assistant far more often than journal entries do
+CHAT_EMOTION_LEXICON = {
+    "grateful": ["thanks", "thank you"]
+}
+
+# Emotions on opposite sides; a message that mixes them is left to the model
+POSITIVE_EMOTIONS = {"happy", "calm", "excited", "grateful", "hopeful", "proud"}
+NEGATIVE_EMOTIONS = {"sad", "angry", "anxious", "tired", "confused", "overwhelmed"}
+
+# Words that carry no emotion or theme and do not count against confidence
+FILLER_WORDS = {
+    "i", "im", "i'm", "me", "my", "myself", "a", "an", "the", "and", "so", "very", "really", "just", "too",
+    "is", "am", "are", "was", "been", "be", "it", "it's", "that", "this", "of", "to", "for", "at", "in", "on",
+    "feel", "feeling", "felt", "today", "tonight", "lately", "now", "right", "bit", "little", "kind",
+    "pretty", "much", "all", "again", "still", "quite", "super", "lot", "you", "oh", "ok", "okay", "well",
+    "about", "with", "but", "also", "because", "have", "had", "has", "got", "getting"
+}
+
+NEGATIONS = {"not", "no", "never", "nothing", "without", "hardly", "don't", "dont", "isn't", "wasn't",
+             "aren't", "can't", "cannot", "won't", "didn't", "doesn't", "haven't", "neither", "nor"}
+
+DEFAULT_CONFIDENCE = 0.6
+
+
+def load_lexicons(path=None):
+    """The built-in chat lexicons, extended with the JSON file at path (or LEXICON_PATH) if any"""
+    emotions = {label: list(words) for label, words in EMOTION_LEXICON.items()}
+    for label, words in CHAT_EMOTION_LEXICON.items():
+        emotions.setdefault(label, []).extend(words)
+    themes = {label: list(words) for label, words in THEME_LEXICON.items()}
+    path = path or os.environ.get('LEXICON_PATH')
+    if path:
+        with open(path) as f:
+            extra = json.load(f)
+        for target, entries in ((emotions, extra.get("emotions", {})), (themes, extra.get("themes", {}))):
+            for label, words in entries.items():
+                target.setdefault(label, []).extend(words)
+    return emotions, themes
+
+
+def valence(emotions):
+    """"positive", "negative", "mixed" or "neutral" for a collection of emotion labels"""
+    positive = bool(set(emotions) & POSITIVE_EMOTIONS)
+    negative = bool(set(emotions) & NEGATIVE_EMOTIONS)
+    if positive and negative:
+        return "mixed"
+    return "positive" if positive else "negative" if negative else "neutral"
+
+
+def _compile(lexicon):
+    """Map each stemmed word or phrase to the labels it signals"""
+    index = {}
+    for label, words in lexicon.items():
+        for word in words:
+            key = " ".join(stem(part) for part in word.lower().split())
+            index.setdefault(key, [])
+            if label not in index[key]:
+                index[key].append(label)
+    return index
+
+
+class LexiconClassifier:
+    """CPU-only emotion/theme labelling for chat turns, with a confidence score.
+
+    Words (and two-word phrases) are stemmed and looked up in the compiled
+    lexicons. Confidence is the share of the message's non-filler words that
+    the lexicons explain, halved when positive and negative emotions are
+    mixed. Messages with no emotion word, a negation near a match, a
+    question, or confidence under the threshold are escalated to the model.
+    """
+
+    def __init__(self, threshold=None, lexicon_path=None):
+        self.threshold = float(threshold or os.environ.get('LEXICON_CONFIDENCE', DEFAULT_CONFIDENCE))
+        emotions, themes = load_lexicons(lexicon_path)
+        self.emotion_labels = set(emotions)
+        self.emotions = _compile(emotions)
+        self.themes = _compile(themes)
+        self._lock = threading.Lock()
+        self._counters = {
+            "answered": 0, "no_emotion": 0, "negation": 0, "question": 0, "low_confidence": 0
+        }
+        self._seconds = 0.0
+
+    def score(self, text):
+        """Return (emotions, themes, confidence, reason) for text; reason is None when confident"""
+        words = re.findall(r"[a-z][a-z'-]*", text.lower())
+        stems = [stem(word) for word in words]
+        emotions, themes, covered, negated = [], [], set(), False
+
+        for size in (2, 1):
+            for i in range(len(stems) - size + 1):
+                if size == 1 and i in covered:
+                    continue
+                key = " ".join(stems[i:i + size])
+                labels = self.emotions.get(key, []) + self.themes.get(key, [])
+                if not labels:
+                    continue
+                covered.update(range(i, i + size))
+                emotions.extend(label for label in self.emotions.get(key, []) if label not in emotions)
+                themes.extend(label for label in self.themes.get(key, []) if label not in themes)
+                if any(word in NEGATIONS for word in words[max(0, i - 3):i]):
+                    negated = True
+
+        content = [i for i, word in enumerate(words) if word not in FILLER_WORDS or i in covered]
+        confidence = len(covered) / len(content) if content else 0.0
+        if valence(emotions) == "mixed":
+            confidence /= 2
+
+        if not emotions:
+            reason = "no_emotion"
+        elif negated:
+            reason = "negation"
+        elif text.strip().endswith("?"):
+            reason = "question"
+        elif confidence < self.threshold:
+            reason = "low_confidence"
+        else:
+            reason = None
+        return emotions, themes, round(confidence, 3), reason
+
+    def canonical(self, emotions):
+        """Map free-form emotion names (e.g. a model's "stressed") onto lexicon labels where known"""
+        labels = []
+        for emotion in emotions:
+            name = str(emotion).strip().lower()
+            key = " ".join(stem(part) for part in name.split())
+            for label in ([name] if name in self.emotion_labels else self.emotions.get(key, [name])):
+                if label not in labels:
+                    labels.append(label)
+        return labels
+
+    def classify(self, text):
+        """The turn's {"emotions", "themes"} when the lexicons are confident, else None"""
+        start = time.perf_counter()
+        emotions, themes, _, reason = self.score(text)
+        with self._lock:
+            self._seconds += time.perf_counter() - start
+            self._counters[reason or "answered"] += 1
+        if reason:
+            return None
+        return {"emotions": emotions, "themes": themes or ["general"]}
+
+    def stats(self):
+        """Fast-path answers, escalations by reason and classification time, for monitoring"""
+        with self._lock:
+            counters = dict(self._counters)
+            seconds = self._seconds
+        calls = sum(counters.values())
+        answered = counters.pop("answered")
+        return {
+            "threshold": self.threshold,
+            "calls": calls,
+            "answered": answered,
+            "llm_calls_avoided": answered,
+            "escalated": counters,
+            "fast_path_rate": round(answered / calls, 3) if calls else 0.0,
+            "avg_micros": round(seconds / calls * 1e6, 1) if calls else 0.0
+        }
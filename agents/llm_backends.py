@@ -0,0 +1,157 @@
+import os
+import time
+import random
+import threading
+from llm_breaker import CircuitBreaker, OPEN
+from llm_errors import LLMUnavailableError
+
+DEFAULT_HEALTH_INTERVAL = 15
+DEFAULT_AFFINITY_PENALTY = 2
+
+
+def model_name(model):
+    """Normalise a model reference the way Ollama does (an untagged name means :latest)"""
+    return model if ':' in model else f"{model}:latest"
+
+
+class Backend:
+    """One Ollama endpoint: its circuit breaker, in-flight calls and known models"""
+
+    def __init__(self, host, probe):
+        self.host = host
+        self.breaker = CircuitBreaker(probe=lambda: probe(self))
+        self.healthy = True
+        self.outstanding = 0
+        self.routed = 0
+        # None until the first health check has listed them
+        self.models = None
+        self.loaded = set()
+        self.last_check = None
+        self.last_error = None
+
+    def serves(self, model):
+        return self.models is None or model in self.models
+
+
+class BackendRegistry:
+    """The Ollama endpoints calls can be routed to, with health checks.
+
+    Each call goes to the backend with the fewest outstanding calls among
+    those that are healthy, not tripped and have the model. Backends that
+    do not have the model resident are charged affinity_penalty extra calls,
+    so traffic stays where the model is loaded unless that backend is
+    clearly busier. A background thread lists every backend's models
+    (/api/tags) and resident models (/api/ps) every health_interval
+    seconds; a backend that fails the check leaves rotation until it
+    answers again.
+    """
+
+    def __init__(self, hosts, probe, inspect, health_interval=None, affinity_penalty=None):
+        self.backends = [Backend(host, probe) for host in hosts]
+        self.inspect = inspect
+        self.health_interval = float(health_interval or os.environ.get('LLM_HEALTH_INTERVAL', DEFAULT_HEALTH_INTERVAL))
+        self.affinity_penalty = float(affinity_penalty or os.environ.get('LLM_AFFINITY_PENALTY', DEFAULT_AFFINITY_PENALTY))
+        self._lock = threading.Lock()
+        self._checker = None
+        # When each model was last routed, for the keep-alive scheduler
+        self.last_used = {}
+
+    def __len__(self):
+        return len(self.backends)
+
+    @property
+    def primary(self):
+        """The first configured backend, used for calls that need no routing"""
+        return self.backends[0]
+
+    def acquire(self, model, exclude=()):
+        """Pick a backend for a call to model and count the call against it.
+
+        Raises LLMUnavailableError when every candidate is unhealthy or has
+        its breaker open. Pair with release().
+        """
+        model = model_name(model) if model else None
+        with self._lock:
+            if model:
+                self.last_used[model] = time.time()
+            candidates = [b for b in self.backends if b not in exclude and b.healthy and b.breaker.state != OPEN]
+            if model:
+                # Route to backends that have the model, unless none of them is up
+                candidates = [b for b in candidates if b.serves(model)] or candidates
+
+            def load(backend):
+                penalty = 0 if model is None or model in backend.loaded else self.affinity_penalty
+                return backend.outstanding + penalty
+
+            random.shuffle(candidates)
+            for backend in sorted(candidates, key=load):
+                if backend.breaker.allow():
+                    backend.outstanding += 1
+                    backend.routed += 1
+                    return backend
+        hosts = ", ".join(b.host for b in self.backends if b not in exclude)
+        raise LLMUnavailableError(f"No Ollama backend available ({hosts or 'none left'}), serving fallback")
+
+    def release(self, backend, model=None):
+        """Finish a call; a successful one (model given) marks the model resident there"""
+        with self._lock:
+            backend.outstanding -= 1
+            if model:
+                backend.loaded.add(model_name(model))
+
+    def start_health_checks(self):
+        """Check every backend now and then every health_interval seconds, in the background"""
+        with self._lock:
+            if self._checker is not None:
+                return
+            self._checker = threading.Thread(target=self._check_loop, name='llm-health-check', daemon=True)
+        self._checker.start()
+
+    def _check_loop(self):
+        while True:
+            self.check_all()
+            time.sleep(self.health_interval)
+
+    def check_all(self):
+        """Run one health check against every backend"""
+        for backend in self.backends:
+            try:
+                models, loaded = self.inspect(backend)
+            except Exception as e:
+                with self._lock:
+                    if backend.healthy:
+                        print(f"⚠️ Ollama backend {backend.host} failed its health check, taking it out of rotation")
+                    backend.healthy = False
+                    backend.last_error = str(e)
+                    backend.last_check = time.time()
+                continue
+            with self._lock:
+                if not backend.healthy:
+                    print(f"✅ Ollama backend {backend.host} is healthy again")
+                backend.healthy = True
+                backend.models = {model_name(m) for m in models}
+                backend.loaded = {model_name(m) for m in loaded}
+                backend.last_error = None
+                backend.last_check = time.time()
+
+    def models(self):
+        """Every model available on at least one healthy backend"""
+        with self._lock:
+            return sorted(set().union(*(b.models or () for b in self.backends if b.healthy)))
+
+    def stats(self):
+        """Per-backend health, load and routing counters, for monitoring"""
+        with self._lock:
+            backends = [{
+                "host": b.host,
+                "healthy": b.healthy,
+                "outstanding": b.outstanding,
+                "routed": b.routed,
+                "models": sorted(b.models) if b.models is not None else None,
+                "loaded": sorted(b.loaded),
+                "last_check": round(time.time() - b.last_check, 1) if b.last_check else None,
+                "last_error": b.last_error
+            } for b in self.backends]
+        for entry, backend in zip(backends, self.backends):
+            entry["breaker"] = backend.breaker.stats()
+        return {"affinity_penalty": self.affinity_penalty, "backends": backends}
@@ -0,0 +1,128 @@
+import os
+import time
+import threading
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Trips when the model backend keeps failing so callers fall back at once.
+
+    Every backend call reports its outcome. The breaker opens after
+    max_consecutive failures in a row, or when the failure ratio over the
+    last window_size calls reaches failure_ratio; calls slower than
+    slow_seconds count as failures. While open, allow() is False and a
+    background thread runs probe() every probe_interval seconds. A
+    successful probe half-opens the breaker: one trial call goes through and
+    its outcome closes or re-opens it.
+    """
+
+    def __init__(self, probe, max_consecutive=None, window_size=None, failure_ratio=None,
+                 slow_seconds=None, probe_interval=None):
+        self.probe = probe
+        self.max_consecutive = int(max_consecutive or os.environ.get('LLM_BREAKER_FAILURES', 5))
+        self.window_size = int(window_size or os.environ.get('LLM_BREAKER_WINDOW', 20))
+        self.failure_ratio = float(failure_ratio or os.environ.get('LLM_BREAKER_FAILURE_RATIO', 0.5))
+        self.slow_seconds = float(slow_seconds or os.environ.get('LLM_BREAKER_SLOW_SECONDS', 60))
+        self.probe_interval = float(probe_interval or os.environ.get('LLM_BREAKER_PROBE_INTERVAL', 5))
+
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=self.window_size)
+        self._consecutive = 0
+        self._trial_in_flight = False
+        self._opened_at = None
+        self.trips = 0
+        self.short_circuited = 0
+        self.last_error = None
+
+    def allow(self):
+        """Whether a backend call may go ahead right now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def abandon(self):
+        """Give back a call allow() let through that never reached the backend"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self, latency):
+        """Report a completed backend call and how long it took"""
+        if latency > self.slow_seconds:
+            self.record_failure(f"slow response ({latency:.1f}s)")
+            return
+        with self._lock:
+            self._outcomes.append(True)
+            self._consecutive = 0
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                self.state = CLOSED
+                self._outcomes.clear()
+                print("✅ LLM circuit breaker closed: backend recovered")
+
+    def record_failure(self, reason):
+        """Report a failed backend call"""
+        with self._lock:
+            self.last_error = reason
+            self._outcomes.append(False)
+            self._consecutive += 1
+
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                self._open(reason)
+                return
+
+            failures = self._outcomes.count(False)
+            window_full = len(self._outcomes) >= self.window_size
+            if self.state == CLOSED and (
+                self._consecutive >= self.max_consecutive
+                or (window_full and failures / len(self._outcomes) >= self.failure_ratio)
+            ):
+                self._open(reason)
+
+    def _open(self, reason):
+        """Trip the breaker and start probing; caller holds the lock"""
+        self.state = OPEN
+        self._opened_at = time.time()
+        self.trips += 1
+        print(f"🔌 LLM circuit breaker open: {reason}. Serving fallbacks until the backend recovers")
+        threading.Thread(target=self._probe_loop, name='llm-breaker-probe', daemon=True).start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self.state == OPEN:
+                        self.state = HALF_OPEN
+                        self._trial_in_flight = False
+                        print("🔍 LLM backend answered a probe, letting a trial call through")
+                return
+
+    def stats(self):
+        """Breaker state and counters, for monitoring"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+                "recent_failures": self._outcomes.count(False),
+                "window": len(self._outcomes),
+                "consecutive_failures": self._consecutive,
+                "open_for": round(time.time() - self._opened_at, 1) if self.state != CLOSED and self._opened_at else 0,
+                "last_error": self.last_error
+            }
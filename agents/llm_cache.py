@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 512
+
+# Seconds a generation stays reusable, per agent label. Agents not listed here
+# (and any with a TTL of 0) are never cached. Override with LLM_CACHE_TTL_<AGENT>.
+AGENT_TTLS = {
+    "analysis": 900,
+    "emotion_detector": 900,
+    "theme_extractor": 900,
+    "word_drop": 600,
+    "memory_match": 600,
+    "would_you_rather": 600,
+    "breathing_rhythm": 3600
+}
+
+
+def agent_ttl(agent):
+    """Return the cache TTL in seconds for an agent label (0 = do not cache)"""
+    if not agent:
+        return 0
+    override = os.environ.get(f"LLM_CACHE_TTL_{agent.upper()}")
+    if override is not None:
+        return float(override)
+    return AGENT_TTLS.get(agent, 0)
+
+
+def cache_key(model, prompt, options=None, extra=None):
+    """Hash everything that changes what the model would generate"""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "options": options or {}, "extra": extra or {}},
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """Size-bounded LRU cache of model responses with per-entry TTLs.
+
+    An optional SQLite file (LLM_CACHE_PATH) acts as a second tier so cached
+    generations survive restarts; memory misses fall through to it and hits
+    are promoted back into the LRU. The file may be shared by several server
+    workers: a disk read or write that fails (e.g. while another worker holds
+    the lock past busy_timeout) is logged and skipped, never failing the
+    generation that was being cached.
+    """
+
+    def __init__(self, max_entries=None, disk_path=None):
+        self.max_entries = int(max_entries or os.environ.get('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.disk_path = disk_path or os.environ.get('LLM_CACHE_PATH')
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._disk = None
+        self._disk_errors = 0
+
+        if self.disk_path:
+            self._disk = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._disk.execute("PRAGMA busy_timeout=5000")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS generations (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._disk.execute("DELETE FROM generations WHERE expires_at < ?", (time.time(),))
+            self._disk.commit()
+
+        tier = f", disk tier at {self.disk_path}" if self._disk else ""
+        print(f"🗃️ Generation cache ready: {self.max_entries} entries{tier}")
+
+    def _count(self, agent, outcome):
+        counters = self._counters.setdefault(agent or "unlabelled", {"hits": 0, "disk_hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, key, agent=None):
+        """Return the cached response for key, or None if absent or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._count(agent, "hits")
+                    return value
+                del self._entries[key]
+
+            if self._disk is not None:
+                try:
+                    row = self._disk.execute(
+                        "SELECT value, expires_at FROM generations WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    self._disk_failed("read", e)
+                    row = None
+                if row and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self._count(agent, "disk_hits")
+                    return row[0]
+
+            self._count(agent, "misses")
+            return None
+
+    def put(self, key, value, ttl):
+        """Cache value under key for ttl seconds"""
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._disk is not None:
+                try:
+                    self._disk.execute(
+                        "INSERT OR REPLACE INTO generations (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    self._disk_failed("write", e)
+
+    def discard(self, key):
+        """Drop key from both tiers, e.g. when its value turned out to be unusable"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._disk is not None:
+                try:
+                    self._disk.execute("DELETE FROM generations WHERE key = ?", (key,))
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    self._disk_failed("delete", e)
+
+    def _disk_failed(self, operation, error):
+        """Log a failed disk tier operation; the memory tier carries on without it"""
+        self._disk_errors += 1
+        if self._disk.in_transaction:
+            self._disk.rollback()
+        print(f"⚠️ Generation cache disk {operation} failed: {str(error)}")
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters per agent plus current size, for monitoring"""
+        with self._lock:
+            per_agent = {agent: dict(counters) for agent, counters in self._counters.items()}
+            size = len(self._entries)
+            disk_errors = self._disk_errors
+        hits = sum(c["hits"] + c["disk_hits"] for c in per_agent.values())
+        misses = sum(c["misses"] for c in per_agent.values())
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "disk_tier": bool(self._disk),
+            "disk_errors": disk_errors,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "agents": per_agent
+        }
@@ -0,0 +1,614 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from llm_errors import (
+    LLMError, LLMTimeoutError, LLMConnectionError, LLMOverloadedError, LLMUnavailableError, LLMOutputError
+)
+from llm_cache import GenerationCache, agent_ttl, cache_key
+from llm_singleflight import SingleFlight
+from llm_scheduler import LLMScheduler, DEFAULT_MAX_CONCURRENCY, priority_for
+from llm_backends import BackendRegistry
+from llm_prompts import PrefixTracker
+from llm_schemas import SchemaRegistry, JSONObjectScanner
+from llm_profiles import GenerationProfiles
+from llm_latency import LatencyTracker
+from llm_warmup import ModelWarmer
+
+DEFAULT_HOST = "http://localhost:11434"
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 120
+CONNECT_TIMEOUT = 5
+
+
+def _normalize_host(host):
+    """Accept OLLAMA_HOST in the forms the Ollama CLI does (with or without scheme)"""
+    host = host.strip().rstrip('/')
+    if not host.startswith('http://') and not host.startswith('https://'):
+        host = f"http://{host}"
+    return host
+
+
+def _timed_out(error):
+    """Whether a requests error is a timeout, including a read timeout while the
+    body is read, which requests re-raises as a ConnectionError"""
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    return any(isinstance(cause, ReadTimeoutError) for cause in (*error.args, error.__context__))
+
+
+class OllamaClient:
+    """Shared HTTP client for the Ollama API backed by a keep-alive connection pool"""
+
+    def __init__(self, host=None, pool_size=None, timeout=None):
+        # OLLAMA_HOSTS lists several backends (comma separated); the first is the primary
+        hosts = host or os.environ.get('OLLAMA_HOSTS') or os.environ.get('OLLAMA_HOST', DEFAULT_HOST)
+        self.backends = BackendRegistry(
+            [_normalize_host(h.strip()) for h in hosts.split(',') if h.strip()],
+            probe=self._probe,
+            inspect=self._inspect
+        )
+        self.host = self.backends.primary.host
+        self.pool_size = int(pool_size or os.environ.get('OLLAMA_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.timeout = float(timeout or os.environ.get('OLLAMA_TIMEOUT', DEFAULT_TIMEOUT))
+
+        # One session per process: connections are reused across threads and
+        # requests block on the pool instead of opening unbounded sockets.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=len(self.backends),
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+            max_retries=0
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.cache = GenerationCache()
+        self.inflight = SingleFlight()
+        # Backend slots are shared by every worker process (LLM_WORKERS, set by gunicorn.conf.py)
+        slots = int(os.environ.get('OLLAMA_NUM_PARALLEL', DEFAULT_MAX_CONCURRENCY)) * len(self.backends)
+        workers = int(os.environ.get('LLM_WORKERS', 1))
+        self.scheduler = LLMScheduler(max(1, -(-slots // workers)))
+        self.prompts = PrefixTracker(slots=slots)
+        self.schemas = SchemaRegistry()
+        self.profiles = GenerationProfiles()
+        self.latency = LatencyTracker()
+        self.warmup = ModelWarmer(self)
+
+        # Hedging: with several backends, non-streamed calls from these agents that
+        # outlive their p95 latency get a duplicate on another backend; the first answer wins.
+        self.hedge_agents = {
+            agent.strip() for agent in os.environ.get('LLM_HEDGE_AGENTS', 'therapy_agent').split(',') if agent.strip()
+        }
+        self._hedge_pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='llm-hedge')
+
+        self.backends.start_health_checks()
+        print(f"🔌 LLM client ready: {', '.join(b.host for b in self.backends.backends)} (pool size {self.pool_size})")
+
+    def _request(self, method, path, payload=None, timeout=None, stream=False, backend=None, guarded=True):
+        """Send a request to an Ollama backend, mapping transport failures to LLMError.
+
+        backend defaults to the primary. Guarded (model) calls report their
+        outcome and latency to the backend's circuit breaker; the registry
+        has already checked that the breaker lets them through.
+        """
+        timeout = timeout or self.timeout
+        backend = backend or self.backends.primary
+        host = backend.host
+
+        start = time.monotonic()
+        try:
+            response = self.session.request(
+                method,
+                f"{host}{path}",
+                json=payload,
+                timeout=(CONNECT_TIMEOUT, timeout),
+                stream=stream
+            )
+        except requests.exceptions.RequestException as e:
+            if _timed_out(e):
+                if guarded:
+                    backend.breaker.record_failure(f"timeout after {timeout:.0f}s")
+                raise LLMTimeoutError(f"Ollama did not respond within {timeout:.0f} seconds") from e
+            if guarded:
+                backend.breaker.record_failure(f"connection error: {str(e)}")
+            raise LLMConnectionError(f"Could not reach Ollama at {host}: {str(e)}") from e
+
+        if response.status_code != 200:
+            body = response.text.strip()
+            response.close()
+            if guarded:
+                # 4xx means a bad request (e.g. unknown model), not a sick backend
+                if response.status_code >= 500:
+                    backend.breaker.record_failure(f"HTTP {response.status_code}")
+                else:
+                    backend.breaker.record_success(time.monotonic() - start)
+            raise LLMError(f"Ollama returned {response.status_code}: {body}")
+
+        if guarded:
+            backend.breaker.record_success(time.monotonic() - start)
+        return response
+
+    def _probe(self, backend):
+        """Cheap reachability check used by a backend's circuit breaker while open"""
+        response = self._request('GET', '/api/tags', timeout=5, backend=backend, guarded=False)
+        response.close()
+        return True
+
+    def _inspect(self, backend):
+        """Health check for the backend registry; returns (available models, resident models)"""
+        tags = self._request('GET', '/api/tags', timeout=5, backend=backend, guarded=False).json()
+        running = self._request('GET', '/api/ps', timeout=5, backend=backend, guarded=False).json()
+        return (
+            [model.get('name') for model in tags.get('models', [])],
+            [model.get('name') for model in running.get('models', [])]
+        )
+
+    def _route(self, path, payload, timeout, stream=False):
+        """Send a model call to a backend picked by the registry; returns (backend, response).
+
+        A backend that cannot be reached is skipped and the call goes to the
+        next best one, so a node that died since its last health check costs
+        a retry rather than a failed call. The caller releases the backend.
+        """
+        tried = []
+        while True:
+            backend = self.backends.acquire(payload.get('model'), exclude=tried)
+            try:
+                return backend, self._request('POST', path, payload, timeout, stream=stream, backend=backend)
+            except LLMUnavailableError:
+                self.backends.release(backend)
+                raise
+            except LLMConnectionError:
+                self.backends.release(backend)
+                tried.append(backend)
+                if len(tried) == len(self.backends):
+                    raise
+
+    def _post(self, path, payload, timeout=None, agent=None, backend=None):
+        """POST a JSON payload to an Ollama backend and return the decoded body.
+
+        The call first waits for a slot in the agent's scheduler priority
+        class; time spent queued counts against the timeout. The backend is
+        picked by the registry unless one is given (the caller then owns its
+        accounting). The timeout is tightened to the agent's adaptive timeout
+        (see llm_latency) and the service time of successful calls is
+        recorded for it.
+        """
+        timeout = self.latency.timeout_for(agent, timeout or self.timeout)
+        waited = self.scheduler.acquire(priority_for(agent), timeout)
+        routed = backend is None
+        completed = False
+        try:
+            start = time.monotonic()
+            if routed:
+                backend, response = self._route(path, payload, max(1.0, timeout - waited))
+            else:
+                response = self._request('POST', path, payload, max(1.0, timeout - waited), backend=backend)
+            try:
+                data = response.json()
+            except ValueError as e:
+                raise LLMError(f"Ollama returned an invalid body: {str(e)}") from e
+            self.latency.record(agent, time.monotonic() - start)
+            completed = True
+            return data
+        finally:
+            if routed and backend is not None:
+                self.backends.release(backend, payload.get('model') if completed else None)
+            self.scheduler.release()
+
+    def _stream(self, path, payload, timeout=None, agent=None, backend=None):
+        """POST a streaming request and yield each decoded NDJSON chunk.
+
+        The scheduler slot (and the backend, when the registry picked it) is
+        held until the stream is exhausted or closed. A backend given by the
+        caller must come from the registry's acquire(). timeout bounds the wait
+        for each chunk; it is tightened to the agent's adaptive timeout, and
+        the longest wait of a completed stream is recorded for it.
+        """
+        timeout = self.latency.timeout_for(agent, timeout or self.timeout, streamed=True)
+        payload = dict(payload, stream=True)
+        routed = backend is None
+        try:
+            waited = self.scheduler.acquire(priority_for(agent), timeout)
+        except LLMError:
+            if not routed:
+                # The caller's backend let this call through its breaker (possibly
+                # as the half-open trial), but it never got sent
+                backend.breaker.abandon()
+            raise
+        start = time.monotonic()
+        try:
+            if routed:
+                backend, response = self._route(path, payload, max(1.0, timeout - waited), stream=True)
+            else:
+                response = self._request('POST', path, payload, max(1.0, timeout - waited), stream=True, backend=backend)
+        except BaseException:
+            if routed and backend is not None:
+                self.backends.release(backend)
+            self.scheduler.release()
+            raise
+        completed = False
+        try:
+            last, longest, recorded = start, 0.0, False
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                now = time.monotonic()
+                longest, last = max(longest, now - last), now
+                try:
+                    chunk = json.loads(line)
+                except ValueError as e:
+                    raise LLMError(f"Ollama returned an invalid stream chunk: {str(e)}") from e
+                if chunk.get('error'):
+                    raise LLMError(f"Ollama stream error: {chunk['error']}")
+                if chunk.get('done'):
+                    self.latency.record(agent, longest, streamed=True)
+                    recorded = completed = True
+                yield chunk
+                if chunk.get('done'):
+                    break
+        except GeneratorExit:
+            # Closed by the consumer (e.g. once a JSON object is complete)
+            if not recorded:
+                self.latency.record(agent, longest, streamed=True)
+            completed = True
+            raise
+        except requests.exceptions.RequestException as e:
+            if _timed_out(e):
+                backend.breaker.record_failure(f"stream stalled for {timeout:.0f}s")
+                raise LLMTimeoutError(f"Ollama stalled for more than {timeout:.0f} seconds") from e
+            backend.breaker.record_failure(f"stream connection error: {str(e)}")
+            raise LLMConnectionError(f"Lost connection to Ollama at {backend.host}: {str(e)}") from e
+        finally:
+            # Closing early drops the connection, which makes Ollama stop generating
+            response.close()
+            if routed:
+                self.backends.release(backend, payload.get('model') if completed else None)
+            self.scheduler.release()
+
+    def _post_hedged(self, path, payload, timeout, agent):
+        """POST a non-streamed generation, hedging it for latency-critical agents.
+
+        For agents in hedge_agents (with more than one backend and enough
+        latency samples) the call is sent as a stream; if it has not finished
+        by the agent's p95 latency a duplicate goes to another backend. The
+        first attempt to finish wins and the other is cancelled, which drops
+        its connection and stops that generation.
+        """
+        delay = None
+        if len(self.backends) > 1 and agent in self.hedge_agents:
+            delay = self.latency.hedge_delay(agent)
+        if delay is None:
+            return self._post(path, payload, timeout, agent)
+
+        model = payload.get('model')
+        cancel = threading.Event()
+        start = time.monotonic()
+        primary = self.backends.acquire(model)
+        attempts = [self._attempt(path, payload, timeout, agent, primary, cancel)]
+        done, _ = wait(attempts, timeout=delay)
+        if not done:
+            try:
+                backup = self.backends.acquire(model, exclude=(primary,))
+            except LLMUnavailableError:
+                backup = None
+            if backup is not None:
+                print(f"🔀 {agent} slower than {delay:.1f}s on {primary.host}, hedging on {backup.host}")
+                self.latency.record_hedge(agent)
+                remaining = max(1.0, (timeout or self.timeout) - delay)
+                attempts.append(self._attempt(path, payload, remaining, agent, backup, cancel))
+
+        error = None
+        for future in as_completed(attempts):
+            try:
+                data = future.result()
+            except LLMError as e:
+                error = error or e
+                continue
+            cancel.set()
+            self.latency.record(agent, time.monotonic() - start)
+            if future is not attempts[0]:
+                self.latency.record_hedge(agent, won=True)
+            return data
+        raise error
+
+    def _attempt(self, path, payload, timeout, agent, backend, cancel):
+        """Run one hedged attempt on backend in the hedge pool; the backend is released when it ends"""
+        future = self._hedge_pool.submit(self._collect, path, payload, timeout, agent, backend, cancel)
+
+        def finished(future):
+            succeeded = not future.cancelled() and future.exception() is None
+            self.backends.release(backend, payload.get('model') if succeeded else None)
+        future.add_done_callback(finished)
+        return future
+
+    def _collect(self, path, payload, timeout, agent, backend, cancel):
+        """Stream a generation from backend and return it as a non-streamed response body.
+
+        Gives up between chunks once cancel is set.
+        """
+        pieces = []
+        stream = self._stream(path, payload, timeout, agent, backend)
+        try:
+            for chunk in stream:
+                if cancel.is_set():
+                    raise LLMError("Hedged generation cancelled, the other attempt finished first")
+                pieces.append(chunk.get('response', ''))
+                if chunk.get('done'):
+                    return dict(chunk, response="".join(pieces))
+        finally:
+            stream.close()
+        raise LLMError("Ollama stream ended without a final chunk")
+
+    def _record(self, agent, prompt, final, tokens=None):
+        """Feed a finished generation to the prompt and output-length metrics.
+
+        final is Ollama's last response body, or None for a generation that
+        was cut short after streaming tokens chunks.
+        """
+        self.prompts.record(agent, prompt, final)
+        if final:
+            self.profiles.record(agent, final.get('eval_count'), final.get('done_reason') == 'length')
+        else:
+            self.profiles.record(agent, tokens)
+
+    def generate(self, model, prompt, timeout=None, options=None, agent=None, **extra):
+        """Run a single completion through /api/generate and return the response text.
+
+        agent labels the caller; agents with a cache TTL (see llm_cache) are
+        served from the generation cache when the same prompt was seen recently,
+        and the label picks the call's scheduler priority class and generation
+        profile (see llm_profiles).
+        """
+        options, timeout = self.profiles.apply(agent, options, timeout)
+        ttl = agent_ttl(agent)
+        key = cache_key(model, prompt, options, extra)
+        if ttl > 0:
+            cached = self.cache.get(key, agent)
+            if cached is not None:
+                print(f"🗃️ Cache hit for {agent}")
+                return cached
+
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False
+        }
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+
+        def run():
+            data = self._post_hedged('/api/generate', payload, timeout, agent)
+            self._record(agent, prompt, data)
+            response = data.get('response', '').strip()
+            if ttl > 0 and response:
+                self.cache.put(key, response, ttl)
+            return response
+
+        # Identical concurrent calls share one generation
+        wait_timeout = (timeout or self.timeout) + CONNECT_TIMEOUT
+        try:
+            return self.inflight.do(key, run, timeout=wait_timeout)
+        except TimeoutError as e:
+            raise LLMTimeoutError(str(e)) from e
+
+    def generate_stream(self, model, prompt, timeout=None, options=None, agent=None, **extra):
+        """Run a completion through /api/generate, yielding text pieces as they arrive"""
+        options, timeout = self.profiles.apply(agent, options, timeout)
+        payload = {
+            "model": model,
+            "prompt": prompt
+        }
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+
+        for chunk in self._stream('/api/generate', payload, timeout, agent):
+            if chunk.get('response'):
+                yield chunk['response']
+            if chunk.get('done'):
+                self._record(agent, prompt, chunk)
+
+    def generate_json(self, model, prompt, agent, timeout=None, options=None, context=None, **extra):
+        """Run a JSON-constrained completion and return the parsed object.
+
+        agent selects the output schema (see llm_schemas); it is sent as the
+        request's format and the response is validated against it. The reply
+        is streamed and generation is cancelled as soon as the top-level
+        object closes, so trailing chatter is never generated. Raises
+        LLMOutputError when the output does not parse or match; only valid
+        output is cached. context continues a session as in
+        generate_with_context and is never cached or coalesced.
+        """
+        options, timeout = self.profiles.apply(agent, options, timeout)
+        output_format = self.schemas.format_for(agent)
+        extra = dict(extra, format=output_format)
+        ttl = 0 if context else agent_ttl(agent)
+        key = cache_key(model, prompt, options, extra)
+        if ttl > 0:
+            cached = self.cache.get(key, agent)
+            if cached is not None:
+                try:
+                    value = self.schemas.parse(agent, cached)
+                    print(f"🗃️ Cache hit for {agent}")
+                    return value
+                except LLMOutputError:
+                    # Stored before the schema changed; generate afresh
+                    self.cache.discard(key)
+
+        payload = {
+            "model": model,
+            "prompt": prompt
+        }
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+
+        def run():
+            text = self._stream_json(payload, timeout, agent)
+            self.schemas.parse(agent, text)
+            if ttl > 0:
+                self.cache.put(key, text, ttl)
+            return text
+
+        # Session calls continue their own conversation and are never shared
+        if context:
+            return json.loads(run())
+
+        # Identical concurrent calls share one generation; every caller gets
+        # its own decoded copy so agents can modify the result freely
+        wait_timeout = (timeout or self.timeout) + CONNECT_TIMEOUT
+        try:
+            return json.loads(self.inflight.do(key, run, timeout=wait_timeout))
+        except TimeoutError as e:
+            raise LLMTimeoutError(str(e)) from e
+
+    def _stream_json(self, payload, timeout, agent):
+        """Stream a completion until its top-level JSON object closes; returns the object's text.
+
+        Stopping early closes the stream, which drops the connection and makes
+        Ollama stop generating. If the model finishes without closing the
+        object, whatever it produced is returned for parse() to reject.
+        """
+        scanner = JSONObjectScanner()
+        tokens = 0
+        stream = self._stream('/api/generate', payload, timeout, agent)
+        try:
+            for chunk in stream:
+                tokens += 1
+                document = scanner.feed(chunk.get('response', ''))
+                if chunk.get('done'):
+                    self._record(agent, payload['prompt'], chunk)
+                    break
+                if document is not None:
+                    self._record(agent, payload['prompt'], None, tokens)
+                    self.schemas.record_early_stop(agent)
+                    break
+        finally:
+            stream.close()
+        return scanner.document or scanner.text
+
+    def generate_with_context(self, model, prompt, context=None, timeout=None, options=None, agent=None,
+                              on_token=None, **extra):
+        """Continue a conversation through /api/generate; returns (text, context).
+
+        context is the token state Ollama returned for the previous turn, so
+        prompt only needs to carry the new message. The returned context
+        covers this turn too and can be passed to the next call. When on_token
+        is given the response is streamed and each text piece is handed to it.
+        These calls are session specific and bypass the generation cache.
+        """
+        options, timeout = self.profiles.apply(agent, options, timeout)
+        payload = {
+            "model": model,
+            "prompt": prompt
+        }
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+
+        if on_token is None:
+            data = self._post_hedged('/api/generate', dict(payload, stream=False), timeout, agent)
+            self._record(agent, prompt, data)
+            return data.get('response', '').strip(), data.get('context')
+
+        # A raising on_token abandons the generation; closing the stream drops
+        # the connection so Ollama stops generating
+        pieces = []
+        new_context = None
+        stream = self._stream('/api/generate', payload, timeout, agent)
+        try:
+            for chunk in stream:
+                if chunk.get('response'):
+                    pieces.append(chunk['response'])
+                    on_token(chunk['response'])
+                if chunk.get('done'):
+                    self._record(agent, prompt, chunk)
+                    new_context = chunk.get('context')
+        finally:
+            stream.close()
+        return "".join(pieces).strip(), new_context
+
+    def chat(self, model, messages, timeout=None, options=None, agent=None, **extra):
+        """Run a chat completion through /api/chat and return the assistant message text"""
+        options, timeout = self.profiles.apply(agent, options, timeout)
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": False
+        }
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+
+        data = self._post('/api/chat', payload, timeout, agent)
+        self.profiles.record(agent, data.get('eval_count'), data.get('done_reason') == 'length')
+        return data.get('message', {}).get('content', '').strip()
+
+    def drain(self, timeout=None):
+        """Wait for in-flight and queued model calls to finish, e.g. before the process exits.
+
+        Returns whether everything finished within timeout.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while not self.scheduler.idle():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        self._hedge_pool.shutdown(wait=False)
+        return True
+
+    def load_model(self, model, backend, keep_alive=None, timeout=None):
+        """Load a model into memory on backend without generating anything"""
+        payload = {"model": model, "prompt": "", "stream": False}
+        if keep_alive:
+            payload["keep_alive"] = keep_alive
+        response = self._request('POST', '/api/generate', payload, timeout, backend=backend, guarded=False)
+        response.close()
+
+    def list_models(self, timeout=10):
+        """Return the names of the models available on any Ollama backend.
+
+        Raises the last backend's error when none of them answers.
+        """
+        names, error = [], None
+        for backend in self.backends.backends:
+            try:
+                response = self._request('GET', '/api/tags', timeout=timeout, backend=backend, guarded=False)
+            except LLMError as e:
+                error = e
+                continue
+            names.extend(model.get('name') for model in response.json().get('models', []))
+        if error and not names:
+            raise error
+        return list(dict.fromkeys(names))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide OllamaClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
+
+
+def drain_llm_client(timeout=None):
+    """Drain the process-wide client, if one was created; returns whether its calls finished"""
+    return _client.drain(timeout) if _client is not None else True
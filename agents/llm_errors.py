@@ -0,0 +1,22 @@
+class LLMError(Exception):
+    """Raised when the model backend fails to produce a response"""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when the model backend does not answer within the call timeout"""
+
+
+class LLMConnectionError(LLMError):
+    """Raised when the model backend cannot be reached at all"""
+
+
+class LLMOverloadedError(LLMError):
+    """Raised when LLM work is rejected because its queue is already full"""
+
+
+class LLMUnavailableError(LLMConnectionError):
+    """Raised without calling the backend while the circuit breaker is open"""
+
+
+class LLMOutputError(LLMError):
+    """Raised when structured output is not valid JSON or breaks its schema"""
@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import deque
+
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_TIMEOUT_FACTOR = 3.0
+DEFAULT_TIMEOUT_FLOOR = 10.0
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LatencyTracker:
+    """Per-agent latency percentiles used to size timeouts and time hedges.
+
+    Non-streamed calls record their total service time; streamed calls
+    record the longest wait for a chunk, since that is what their read
+    timeout bounds. Once an agent has min_samples successes, its timeout
+    becomes timeout_factor x p99 (never below timeout_floor, never above
+    the profile's timeout) so a stuck generation is abandoned after a few
+    multiples of normal latency instead of the full hard-coded limit.
+    """
+
+    def __init__(self, min_samples=None, timeout_factor=None, timeout_floor=None):
+        self.min_samples = int(min_samples or os.environ.get('LLM_ADAPTIVE_MIN_SAMPLES', DEFAULT_MIN_SAMPLES))
+        self.timeout_factor = float(timeout_factor or os.environ.get('LLM_ADAPTIVE_TIMEOUT_FACTOR', DEFAULT_TIMEOUT_FACTOR))
+        self.timeout_floor = float(timeout_floor or os.environ.get('LLM_ADAPTIVE_TIMEOUT_FLOOR', DEFAULT_TIMEOUT_FLOOR))
+        self._lock = threading.Lock()
+        self._series = {}
+        self._hedges = {}
+
+    def record(self, agent, seconds, streamed=False):
+        """Record the latency of a successful call"""
+        with self._lock:
+            self._series.setdefault((agent or "unlabelled", streamed), deque(maxlen=200)).append(seconds)
+
+    def _ordered(self, agent, streamed):
+        samples = self._series.get((agent or "unlabelled", streamed))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return sorted(samples)
+
+    def timeout_for(self, agent, ceiling, streamed=False):
+        """The adaptive timeout for agent, bounded by the ceiling it was given"""
+        with self._lock:
+            ordered = self._ordered(agent, streamed)
+        if ordered is None:
+            return ceiling
+        adaptive = max(self.timeout_floor, _percentile(ordered, 0.99) * self.timeout_factor)
+        return min(ceiling, adaptive) if ceiling else adaptive
+
+    def hedge_delay(self, agent):
+        """Seconds after which a non-streamed call for agent is worth hedging (its p95), or None"""
+        with self._lock:
+            ordered = self._ordered(agent, False)
+        return _percentile(ordered, 0.95) if ordered else None
+
+    def record_hedge(self, agent, won=False):
+        """Count a hedged duplicate being sent, or winning the race"""
+        with self._lock:
+            counters = self._hedges.setdefault(agent or "unlabelled", {"sent": 0, "won": 0})
+            counters["won" if won else "sent"] += 1
+
+    def stats(self):
+        """Latency percentiles, adaptive timeouts and hedge counters per agent, for monitoring"""
+        with self._lock:
+            series = {key: sorted(samples) for key, samples in self._series.items()}
+            hedges = {agent: dict(counters) for agent, counters in self._hedges.items()}
+        agents = {}
+        for (agent, streamed), ordered in series.items():
+            entry = {
+                "samples": len(ordered),
+                "p50": round(_percentile(ordered, 0.5), 3),
+                "p95": round(_percentile(ordered, 0.95), 3),
+                "p99": round(_percentile(ordered, 0.99), 3)
+            }
+            if len(ordered) >= self.min_samples:
+                entry["adaptive_timeout"] = round(max(self.timeout_floor, entry["p99"] * self.timeout_factor), 1)
+            agents.setdefault(agent, {})["stream" if streamed else "call"] = entry
+        for agent, counters in hedges.items():
+            agents.setdefault(agent, {})["hedges"] = counters
+        return {"min_samples": self.min_samples, "timeout_factor": self.timeout_factor, "agents": agents}
@@ -0,0 +1,101 @@
+import os
+import threading
+from collections import deque
+
+# Chat specialists answer in a few sentences; stopping at a new "User:" or
+# "Assistant:" line keeps the model from writing the rest of the conversation.
+REPLY_PROFILE = {"max_tokens": 200, "stop": ["\nUser:", "\nAssistant:"], "temperature": 0.7, "timeout": 60}
+
+# Generation limits per agent label. max_tokens becomes Ollama's num_predict,
+# timeout caps whatever the caller asked for. Labels not listed here are chat
+# specialists and get REPLY_PROFILE. Override with LLM_MAX_TOKENS_<AGENT> and
+# LLM_TIMEOUT_<AGENT>.
+AGENT_PROFILES = {
+    "analysis": {"max_tokens": 120, "temperature": 0.2, "timeout": 30},
+    "emotion_detector": {"max_tokens": 80, "temperature": 0.2, "timeout": 30},
+    "theme_extractor": {"max_tokens": 80, "temperature": 0.2, "timeout": 30},
+    "story_teller_agent": dict(REPLY_PROFILE, max_tokens=300),
+    "poetry_agent": dict(REPLY_PROFILE, max_tokens=160, stop=["\nUser:", "\nAssistant:", "\n\n\n"]),
+    "chat_report": {"max_tokens": 700, "temperature": 0.4, "timeout": 90},
+    "conversation_summary": {"max_tokens": 250, "temperature": 0.3, "timeout": 90},
+    "report": {"max_tokens": 2000, "temperature": 0.7, "top_p": 0.9, "timeout": 30},
+    "journal": {"max_tokens": 800, "temperature": 0.4, "timeout": 60},
+    "word_drop": {"max_tokens": 250, "temperature": 0.8, "timeout": 60},
+    "memory_match": {"max_tokens": 1000, "temperature": 0.8, "timeout": 90},
+    "breathing_rhythm": {"max_tokens": 600, "temperature": 0.6, "timeout": 60},
+    "would_you_rather": {"max_tokens": 1200, "temperature": 0.8, "timeout": 90}
+}
+
+
+def profile_for(agent):
+    """Return the generation profile for an agent label, with env overrides applied"""
+    profile = dict(AGENT_PROFILES.get(agent, REPLY_PROFILE))
+    if agent:
+        max_tokens = os.environ.get(f"LLM_MAX_TOKENS_{agent.upper()}")
+        if max_tokens is not None:
+            profile["max_tokens"] = int(max_tokens)
+        timeout = os.environ.get(f"LLM_TIMEOUT_{agent.upper()}")
+        if timeout is not None:
+            profile["timeout"] = float(timeout)
+    return profile
+
+
+class GenerationProfiles:
+    """Applies per-agent generation profiles and records how long outputs really are.
+
+    The recorded lengths (Ollama's eval_count, or streamed chunks for calls
+    cut short) show how close each agent runs to its token budget and how
+    often it is truncated, so budgets can be tuned from data.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lengths = {}
+
+    def apply(self, agent, options, timeout):
+        """Merge the agent's profile under the caller's options; returns (options, timeout)"""
+        profile = profile_for(agent)
+        merged = {}
+        if profile.get("max_tokens"):
+            merged["num_predict"] = profile["max_tokens"]
+        if profile.get("stop"):
+            merged["stop"] = list(profile["stop"])
+        for name in ("temperature", "top_p"):
+            if name in profile:
+                merged[name] = profile[name]
+        merged.update(options or {})
+
+        limit = profile.get("timeout")
+        if limit:
+            timeout = min(timeout, limit) if timeout else limit
+        return merged, timeout
+
+    def record(self, agent, tokens, truncated=False):
+        """Record the length of one generation in tokens"""
+        if tokens is None:
+            return
+        with self._lock:
+            entry = self._lengths.setdefault(agent or "unlabelled", {
+                "calls": 0, "truncated": 0, "tokens": deque(maxlen=500)
+            })
+            entry["calls"] += 1
+            entry["tokens"].append(tokens)
+            if truncated:
+                entry["truncated"] += 1
+
+    def stats(self):
+        """Per-agent output lengths against budget, for monitoring"""
+        with self._lock:
+            agents = {}
+            for agent, entry in self._lengths.items():
+                tokens = sorted(entry["tokens"])
+                agents[agent] = {
+                    "budget": profile_for(agent).get("max_tokens"),
+                    "calls": entry["calls"],
+                    "truncated_rate": round(entry["truncated"] / entry["calls"], 3),
+                    "tokens_avg": round(sum(tokens) / len(tokens), 1),
+                    "tokens_p50": tokens[len(tokens) // 2],
+                    "tokens_p95": tokens[min(len(tokens) - 1, int(len(tokens) * 0.95))],
+                    "tokens_max": tokens[-1]
+                }
+        return {"agents": agents}
@@ -0,0 +1,109 @@
+import os
+import threading
+
+# Guidance every chat agent gives the model. It opens every prompt so the
+# identical leading tokens can be reused by the inference server's prefix cache.
+SHARED_GUIDELINES = """Try to be as human as possible don't say you are computer generated or AI.
+Make it fast and concise but it should fulfil the query."""
+
+
+def format_history(history, turns=6):
+    """Render the last few turns of a chat history as User:/Assistant: lines.
+
+    A history that starts with a SUMMARY entry was already bounded by
+    ConversationMemory: the summary (if not empty) opens the text and every
+    message after it is kept.
+    """
+    history = history or []
+    history_text = ""
+    if history and history[0]['role'] == 'SUMMARY':
+        if history[0]['content']:
+            history_text += f"Summary of the earlier conversation: {history[0]['content']}\n"
+        messages = history[1:]
+    else:
+        messages = history[-turns:]
+    for turn in messages:
+        role = "User" if turn['role'] == 'USER' else "Assistant"
+        history_text += f"{role}: {turn['content']}\n"
+    return history_text
+
+
+def build_prompt(instructions, inputs=None, history_text=""):
+    """Assemble a prompt with its static parts first and per-call parts last.
+
+    The shared guidelines and the agent's instructions never change between
+    calls, so they form a stable prefix; the conversation and the labelled
+    inputs (strings are quoted, other values rendered as-is) follow them.
+    """
+    sections = [SHARED_GUIDELINES, instructions.strip()]
+    if history_text:
+        sections.append(f"Here is the recent conversation:\n\n{history_text.strip()}\n\nNow based on the current input:")
+    if inputs:
+        sections.append("\n".join(
+            f'{label}: "{value}"' if isinstance(value, str) else f"{label}: {value}"
+            for label, value in inputs.items()
+        ))
+    return "\n\n".join(sections) + "\n"
+
+
+class PrefixTracker:
+    """Measures how much of each prompt the inference server can serve from cache.
+
+    Ollama keeps the KV state of the last prompt evaluated in each parallel
+    slot, so a prompt sharing a long prefix with a recent one only needs its
+    tail evaluated. Each prompt is compared with the last `slots` prompts to
+    estimate that reuse, and the prompt_eval_count/duration Ollama reports are
+    recorded per agent to show what evaluation actually cost.
+    """
+
+    def __init__(self, slots=None):
+        self.slots = int(slots or os.environ.get('OLLAMA_NUM_PARALLEL', 4))
+        self._recent = []
+        self._lock = threading.Lock()
+        self._agents = {}
+
+    def record(self, agent, prompt, data):
+        """Record one generation; data is Ollama's final response body, or None if it was cut short"""
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, previous])) for previous in self._recent), default=0)
+            self._recent.append(prompt)
+            del self._recent[:-self.slots]
+
+            counters = self._agents.setdefault(agent or "unlabelled", {
+                "calls": 0, "prefix_hits": 0, "prompt_chars": 0, "prefix_chars": 0,
+                "reported": 0, "prompt_eval_count": 0, "prompt_eval_seconds": 0.0
+            })
+            counters["calls"] += 1
+            counters["prompt_chars"] += len(prompt)
+            counters["prefix_chars"] += shared
+            # A hit reuses at least the shared guidelines
+            if shared >= len(SHARED_GUIDELINES):
+                counters["prefix_hits"] += 1
+            # Generations cancelled early never receive Ollama's final counters
+            if data and 'prompt_eval_count' in data:
+                counters["reported"] += 1
+                counters["prompt_eval_count"] += data['prompt_eval_count']
+                counters["prompt_eval_seconds"] += data.get('prompt_eval_duration', 0) / 1e9
+
+    def stats(self):
+        """Per-agent prefix reuse and prompt evaluation cost, for monitoring"""
+        with self._lock:
+            agents = {}
+            for agent, counters in self._agents.items():
+                calls = counters["calls"]
+                reported = counters["reported"] or 1
+                agents[agent] = {
+                    "calls": calls,
+                    "prefix_hit_rate": round(counters["prefix_hits"] / calls, 3),
+                    "prefix_share": round(counters["prefix_chars"] / counters["prompt_chars"], 3) if counters["prompt_chars"] else 0.0,
+                    "avg_prompt_eval_count": round(counters["prompt_eval_count"] / reported, 1),
+                    "avg_prompt_eval_seconds": round(counters["prompt_eval_seconds"] / reported, 4)
+                }
+            calls = sum(c["calls"] for c in self._agents.values())
+            hits = sum(c["prefix_hits"] for c in self._agents.values())
+        return {
+            "slots": self.slots,
+            "calls": calls,
+            "prefix_hit_rate": round(hits / calls, 3) if calls else 0.0,
+            "agents": agents
+        }
@@ -0,0 +1,145 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from llm_errors import LLMTimeoutError, LLMOverloadedError
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Lower number = served first. Queue limits bound how many calls of each
+# class may wait for a slot before new ones are rejected outright.
+PRIORITY_CLASSES = {
+    "interactive": {"priority": 0, "queue_limit": 64},
+    "report": {"priority": 1, "queue_limit": 16},
+    "game": {"priority": 2, "queue_limit": 32},
+    "background": {"priority": 3, "queue_limit": 16}
+}
+
+AGENT_PRIORITIES = {
+    "report": "report",
+    "chat_report": "report",
+    "word_drop": "game",
+    "memory_match": "game",
+    "would_you_rather": "game",
+    "breathing_rhythm": "game",
+    "journal": "background",
+    "conversation_summary": "background"
+}
+
+
+def priority_for(agent):
+    """Map an agent label to its priority class; unlabelled work is interactive"""
+    return AGENT_PRIORITIES.get(agent, "interactive")
+
+
+class _Waiter:
+    def __init__(self, priority_class):
+        self.priority_class = priority_class
+        self.event = threading.Event()
+        self.granted = False
+
+
+class LLMScheduler:
+    """Admission control for model calls shared by every agent in the process.
+
+    At most max_concurrency calls run against Ollama at once (match it to
+    OLLAMA_NUM_PARALLEL times the number of backends). Further calls wait in a priority queue, FIFO within
+    a class, and are rejected immediately once their class's queue is full.
+    """
+
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = int(max_concurrency or os.environ.get('OLLAMA_NUM_PARALLEL', DEFAULT_MAX_CONCURRENCY))
+        self.queue_limits = {
+            name: int(os.environ.get(f"LLM_QUEUE_LIMIT_{name.upper()}", spec["queue_limit"]))
+            for name, spec in PRIORITY_CLASSES.items()
+        }
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._queued = {name: 0 for name in PRIORITY_CLASSES}
+        self._metrics = {
+            name: {"admitted": 0, "rejected": 0, "timed_out": 0, "waits": deque(maxlen=500)}
+            for name in PRIORITY_CLASSES
+        }
+        print(f"🚦 LLM scheduler ready: {self.max_concurrency} concurrent calls")
+
+    def acquire(self, priority_class, timeout):
+        """Block until a slot is free for this class; returns seconds spent waiting"""
+        if priority_class not in PRIORITY_CLASSES:
+            priority_class = "interactive"
+        start = time.monotonic()
+
+        with self._lock:
+            if self._active < self.max_concurrency and not self._heap:
+                self._active += 1
+                self._record(priority_class, 0.0)
+                return 0.0
+
+            if self._queued[priority_class] >= self.queue_limits[priority_class]:
+                self._metrics[priority_class]["rejected"] += 1
+                raise LLMOverloadedError(
+                    f"LLM queue for {priority_class} work is full ({self.queue_limits[priority_class]} waiting)"
+                )
+
+            waiter = _Waiter(priority_class)
+            heapq.heappush(self._heap, (PRIORITY_CLASSES[priority_class]["priority"], next(self._seq), waiter))
+            self._queued[priority_class] += 1
+
+        waiter.event.wait(timeout)
+
+        with self._lock:
+            if not waiter.granted:
+                self._heap = [entry for entry in self._heap if entry[2] is not waiter]
+                heapq.heapify(self._heap)
+                self._queued[priority_class] -= 1
+                self._metrics[priority_class]["timed_out"] += 1
+                raise LLMTimeoutError(f"Waited {timeout:.0f} seconds for an LLM slot")
+            waited = time.monotonic() - start
+            self._record(priority_class, waited)
+            return waited
+
+    def release(self):
+        """Hand the slot to the best waiting call, or free it"""
+        with self._lock:
+            if self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                waiter.granted = True
+                self._queued[waiter.priority_class] -= 1
+                waiter.event.set()
+                return
+            self._active -= 1
+
+    def idle(self):
+        """Whether no call is running or waiting"""
+        with self._lock:
+            return self._active == 0 and not self._heap
+
+    def _record(self, priority_class, waited):
+        metrics = self._metrics[priority_class]
+        metrics["admitted"] += 1
+        metrics["waits"].append(waited)
+
+    def stats(self):
+        """Per-class admission counters and recent wait times, for monitoring"""
+        with self._lock:
+            classes = {}
+            for name, metrics in self._metrics.items():
+                waits = sorted(metrics["waits"])
+                classes[name] = {
+                    "queued": self._queued[name],
+                    "queue_limit": self.queue_limits[name],
+                    "admitted": metrics["admitted"],
+                    "rejected": metrics["rejected"],
+                    "timed_out": metrics["timed_out"],
+                    "wait_avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                    "wait_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4) if waits else 0.0,
+                    "wait_max": round(waits[-1], 4) if waits else 0.0
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "classes": classes
+            }
@@ -0,0 +1,327 @@
+import os
+import json
+import threading
+from llm_errors import LLMOutputError
+
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+_SCORE = {"type": ["number", "string"]}
+
+# JSON Schemas for the agents that answer in JSON, keyed by agent label. They
+# are sent to Ollama as the `format` of the request to constrain decoding and
+# checked again on the way back.
+SCHEMAS = {
+    "analysis": {
+        "type": "object",
+        "properties": {"emotions": _STRINGS, "themes": _STRINGS},
+        "required": ["emotions", "themes"]
+    },
+    "emotion_detector": {
+        "type": "object",
+        "properties": {"emotions": _STRINGS},
+        "required": ["emotions"]
+    },
+    "theme_extractor": {
+        "type": "object",
+        "properties": {"themes": _STRINGS},
+        "required": ["themes"]
+    },
+    "chat_report": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string"},
+            "emotions": _STRINGS,
+            "themes": _STRINGS,
+            "motivational_closing": {"type": "string"},
+            "mindfulness_score": _SCORE,
+            "intensity": _SCORE,
+            "trigger_or_catalyst": {"type": "string"},
+            "growth_opportunity": {"type": "string"}
+        },
+        "required": ["summary", "emotions", "themes", "motivational_closing", "mindfulness_score",
+                     "intensity", "trigger_or_catalyst", "growth_opportunity"]
+    },
+    "journal": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string"},
+            "emotions": _STRINGS,
+            "themes": _STRINGS,
+            "insights": _STRINGS,
+            "recommendations": _STRINGS,
+            "sentiment_score": {"type": "number"},
+            "affirmation": {"type": "string"},
+            "mindfulness_score": {"type": "number"}
+        },
+        "required": ["summary", "emotions", "themes", "insights", "recommendations",
+                     "sentiment_score", "affirmation", "mindfulness_score"]
+    },
+    "word_drop": {
+        "type": "object",
+        "properties": {
+            "paragraph": {"type": "string"},
+            "difficulty": {"type": "string"},
+            "theme": {"type": "string"}
+        },
+        "required": ["paragraph"]
+    },
+    "memory_match": {
+        "type": "object",
+        "properties": {
+            "pairs": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string"},
+                        "concept": {"type": "string"},
+                        "match": {"type": "string"},
+                        "category": {"type": "string"}
+                    },
+                    "required": ["id", "concept", "match", "category"]
+                }
+            },
+            "difficulty": {"type": "string"},
+            "theme": {"type": "string"},
+            "title": {"type": "string"},
+            "description": {"type": "string"}
+        },
+        "required": ["pairs", "difficulty", "theme", "title", "description"]
+    },
+    "breathing_rhythm": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "description": {"type": "string"},
+            "difficulty": {"type": "string"},
+            "focus": {"type": "string"},
+            "duration": _SCORE,
+            "pattern": {
+                "type": "object",
+                "properties": {"inhale": _SCORE, "hold1": _SCORE, "exhale": _SCORE, "hold2": _SCORE},
+                "required": ["inhale", "hold1", "exhale", "hold2"]
+            },
+            "instructions": _STRINGS,
+            "benefits": _STRINGS,
+            "affirmations": _STRINGS
+        },
+        "required": ["title", "description", "difficulty", "focus", "duration", "pattern",
+                     "instructions", "benefits", "affirmations"]
+    },
+    "would_you_rather": {
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string"},
+                        "option_a": {"type": "string"},
+                        "option_b": {"type": "string"},
+                        "insight_a": {"type": "string"},
+                        "insight_b": {"type": "string"}
+                    },
+                    "required": ["id", "option_a", "option_b", "insight_a", "insight_b"]
+                }
+            },
+            "category": {"type": "string"},
+            "title": {"type": "string"},
+            "description": {"type": "string"}
+        },
+        "required": ["questions", "category", "title", "description"]
+    }
+}
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool)
+}
+
+
+def compile_schema(schema, path="$"):
+    """Turn a JSON Schema (type/properties/required/items/enum) into a checker.
+
+    The checker returns None for a valid value or a message naming the first
+    offending path. Compiling once up front keeps per-response validation to
+    plain function calls.
+    """
+    checks = []
+
+    types = schema.get("type")
+    if types:
+        types = [types] if isinstance(types, str) else types
+        type_checks = [_TYPE_CHECKS[name] for name in types]
+        expected = " or ".join(types)
+
+        def check_type(value):
+            if not any(check(value) for check in type_checks):
+                return f"{path} should be {expected}, got {type(value).__name__}"
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value):
+            if value not in allowed:
+                return f"{path} should be one of {allowed}"
+        checks.append(check_enum)
+
+    required = schema.get("required", [])
+    properties = {name: compile_schema(sub, f"{path}.{name}") for name, sub in schema.get("properties", {}).items()}
+    if required or properties:
+        def check_object(value):
+            if not isinstance(value, dict):
+                return None
+            for name in required:
+                if name not in value:
+                    return f"{path}.{name} is missing"
+            for name, check in properties.items():
+                if name in value:
+                    error = check(value[name])
+                    if error:
+                        return error
+        checks.append(check_object)
+
+    if "items" in schema:
+        check_item = compile_schema(schema["items"], f"{path}[]")
+
+        def check_items(value):
+            if not isinstance(value, list):
+                return None
+            for item in value:
+                error = check_item(item)
+                if error:
+                    return error
+        checks.append(check_items)
+
+    def check(value):
+        for step in checks:
+            error = step(value)
+            if error:
+                return error
+        return None
+    return check
+
+
+class JSONObjectScanner:
+    """Finds the end of the first top-level JSON object in streamed text.
+
+    Tracks nesting depth and string/escape state across pieces, so the
+    object is known to be complete the moment its closing brace arrives.
+    Text before the opening brace is ignored.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self.document = None
+
+    @property
+    def text(self):
+        """Everything collected from the opening brace on"""
+        return "".join(self._parts)
+
+    def feed(self, piece):
+        """Consume the next piece; returns the object's text once it has closed"""
+        if self.document is not None:
+            return self.document
+        start = 0
+        for i, ch in enumerate(piece):
+            if not self._started:
+                if ch != '{':
+                    continue
+                self._started = True
+                start = i
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(piece[start:i + 1])
+                    self.document = self.text
+                    return self.document
+        if self._started:
+            self._parts.append(piece[start:])
+        return None
+
+
+class SchemaRegistry:
+    """Compiled per-agent output schemas plus parse/validation failure counters.
+
+    LLM_STRUCTURED_FORMAT picks what is sent as the request's `format`:
+    "schema" (default) sends the agent's full JSON Schema, "json" sends plain
+    JSON mode for Ollama versions that predate schema-constrained output.
+    """
+
+    def __init__(self, schemas=None, mode=None):
+        self.schemas = schemas or SCHEMAS
+        self.mode = mode or os.environ.get('LLM_STRUCTURED_FORMAT', 'schema')
+        self._validators = {agent: compile_schema(schema) for agent, schema in self.schemas.items()}
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def format_for(self, agent):
+        """The `format` value to send with a structured request for agent"""
+        if self.mode == "json" or agent not in self.schemas:
+            return "json"
+        return self.schemas[agent]
+
+    def parse(self, agent, text):
+        """Decode and validate a structured response; raises LLMOutputError"""
+        try:
+            value = json.loads(text)
+        except ValueError:
+            # Backends that ignore `format` may still wrap the object in prose
+            start, end = text.find('{'), text.rfind('}') + 1
+            try:
+                value = json.loads(text[start:end]) if 0 <= start < end else None
+            except ValueError:
+                value = None
+            if value is None:
+                self._count(agent, "parse_failures")
+                raise LLMOutputError(f"{agent} output is not valid JSON: {text[:80]!r}")
+
+        validate = self._validators.get(agent)
+        error = validate(value) if validate else None
+        if error:
+            self._count(agent, "schema_failures")
+            raise LLMOutputError(f"{agent} output does not match its schema: {error}")
+        self._count(agent, "valid")
+        return value
+
+    def record_early_stop(self, agent):
+        """Count a generation cancelled as soon as its JSON object closed"""
+        self._count(agent, "early_stops")
+
+    def _count(self, agent, outcome):
+        with self._lock:
+            counters = self._counters.setdefault(agent or "unlabelled", {
+                "valid": 0, "parse_failures": 0, "schema_failures": 0, "early_stops": 0
+            })
+            counters[outcome] += 1
+
+    def stats(self):
+        """Per-agent structured output counters and failure rates, for monitoring"""
+        with self._lock:
+            agents = {}
+            for agent, counters in self._counters.items():
+                failures = counters["parse_failures"] + counters["schema_failures"]
+                total = counters["valid"] + failures
+                agents[agent] = dict(counters, failure_rate=round(failures / total, 3) if total else 0.0)
+        return {"format": self.mode, "agents": agents}
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_SESSIONS = 256
+DEFAULT_IDLE_SECONDS = 1800
+DEFAULT_MAX_TOKENS = 4096
+
+
+class SessionContextStore:
+    """Per-session Ollama conversation state so follow-up turns skip the history.
+
+    Holds the `context` token list Ollama returned for a session's last turn;
+    passing it back with the next prompt lets the model continue the
+    conversation without the transcript being re-sent and re-evaluated.
+    Sessions idle for longer than idle_seconds are dropped, the least recently
+    used ones are evicted beyond max_sessions, and a context that grows past
+    max_tokens is discarded so the next turn starts over from the transcript.
+
+    A context can be stored with the conversation cursor it corresponds to
+    (see conversation_store); it is then only handed out for that cursor, so
+    a worker whose context is older than the conversation (another worker
+    answered a turn in between) starts over from the transcript instead.
+    """
+
+    def __init__(self, max_sessions=None, idle_seconds=None, max_tokens=None):
+        self.max_sessions = int(max_sessions or os.environ.get('LLM_SESSION_MAX', DEFAULT_MAX_SESSIONS))
+        self.idle_seconds = float(idle_seconds or os.environ.get('LLM_SESSION_IDLE_SECONDS', DEFAULT_IDLE_SECONDS))
+        self.max_tokens = int(max_tokens or os.environ.get('LLM_SESSION_MAX_TOKENS', DEFAULT_MAX_TOKENS))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "evicted_idle": 0, "evicted_lru": 0, "reset_oversize": 0}
+        print(f"🧵 Session context store ready: {self.max_sessions} sessions, {self.idle_seconds:.0f}s idle limit")
+
+    def get(self, session_id, cursor=None):
+        """Return the stored context for session_id at cursor, or None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            context, _, stored_cursor = entry
+            if stored_cursor != cursor:
+                del self._sessions[session_id]
+                self._counters["stale"] += 1
+                return None
+            self._sessions[session_id] = (context, now, cursor)
+            self._sessions.move_to_end(session_id)
+            self._counters["hits"] += 1
+            return context
+
+    def put(self, session_id, context, cursor=None):
+        """Remember the context Ollama returned for the session's latest turn, which left it at cursor"""
+        now = time.time()
+        with self._lock:
+            if len(context) > self.max_tokens:
+                self._sessions.pop(session_id, None)
+                self._counters["reset_oversize"] += 1
+                return
+            self._sessions[session_id] = (context, now, cursor)
+            self._sessions.move_to_end(session_id)
+            self._evict_idle(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._counters["evicted_lru"] += 1
+
+    def discard(self, session_id):
+        """Forget a session, e.g. when its conversation was restarted"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_idle(self, now):
+        # Least recently used first, so stop at the first live session
+        while self._sessions:
+            session_id, (_, last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_seconds:
+                break
+            del self._sessions[session_id]
+            self._counters["evicted_idle"] += 1
+
+    def stats(self):
+        """Session counts and context reuse counters, for monitoring"""
+        with self._lock:
+            self._evict_idle(time.time())
+            counters = dict(self._counters)
+            sessions = len(self._sessions)
+            tokens = sum(len(context) for context, _, _ in self._sessions.values())
+        lookups = counters["hits"] + counters["misses"]
+        return dict(
+            counters,
+            sessions=sessions,
+            max_sessions=self.max_sessions,
+            context_tokens=tokens,
+            reuse_rate=round(counters["hits"] / lookups, 3) if lookups else 0.0
+        )
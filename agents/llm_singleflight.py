@@ -0,0 +1,71 @@
+import threading
+
+
+class _Call:
+    """One in-flight generation that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running (followers) block until it finishes and get the
+    same result, or the same exception re-raised.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once for all concurrent callers of key and return its result.
+
+        Followers give up after timeout seconds with TimeoutError; the leader's
+        call is unaffected and still completes for everyone else.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout:.0f} seconds waiting for an identical in-flight call")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """Leader/follower counters for monitoring"""
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": in_flight
+        }
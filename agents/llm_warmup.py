@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from llm_backends import model_name
+from llm_errors import LLMError
+
+DEFAULT_KEEP_ALIVE = "10m"
+DEFAULT_KEEPALIVE_INTERVAL = 240
+DEFAULT_TRAFFIC_WINDOW = 1800
+DEFAULT_WARMUP_TIMEOUT = 300
+
+
+class ModelWarmer:
+    """Probes the backends, preloads the agents' models and keeps them resident.
+
+    Agents register the models they use. start() runs one shared probe of
+    every backend in the background (which ones answer, and which
+    registered models none of them has), then loads each model on every
+    healthy backend that has it (an empty /api/generate request makes
+    Ollama load a model without generating) and then refreshes them every
+    keepalive_interval seconds with keep_alive set, as long as traffic is
+    expected: within traffic_window seconds of startup or of the last call
+    for that model. Quiet models are left to Ollama's own eviction. The
+    service is ready once every registered model is resident somewhere.
+    """
+
+    def __init__(self, client, keep_alive=None, keepalive_interval=None, traffic_window=None, warmup_timeout=None):
+        self.client = client
+        self.keep_alive = keep_alive or os.environ.get('LLM_KEEP_ALIVE', DEFAULT_KEEP_ALIVE)
+        self.keepalive_interval = float(keepalive_interval or os.environ.get('LLM_KEEPALIVE_INTERVAL', DEFAULT_KEEPALIVE_INTERVAL))
+        self.traffic_window = float(traffic_window or os.environ.get('LLM_TRAFFIC_WINDOW', DEFAULT_TRAFFIC_WINDOW))
+        self.warmup_timeout = float(warmup_timeout or os.environ.get('LLM_WARMUP_TIMEOUT', DEFAULT_WARMUP_TIMEOUT))
+        self.models = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started_at = None
+        self._warmed_at = None
+        self._probe = None
+        self.loads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def register(self, model):
+        """Declare a model an agent will call"""
+        with self._lock:
+            self.models.add(model_name(model))
+
+    def start(self):
+        """Warm every registered model in the background and keep them resident"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='llm-warmup', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        started = time.monotonic()
+        self.probe()
+        self.warm(sorted(self.models))
+        print(f"🔥 Model warm-up finished in {time.monotonic() - started:.1f}s: "
+              f"{'ready' if self.ready() else 'not all models resident'}")
+        while True:
+            time.sleep(self.keepalive_interval)
+            self.warm([model for model in sorted(self.models) if self._expects_traffic(model)])
+
+    def probe(self):
+        """Check every backend once and report the registered models none of them has"""
+        registry = self.client.backends
+        registry.check_all()
+        healthy = [b for b in registry.backends if b.healthy]
+        missing = [model for model in sorted(self.models) if not any(b.serves(model) for b in healthy)]
+        with self._lock:
+            self._probe = {
+                "backends_healthy": len(healthy),
+                "backends": len(registry),
+                "missing_models": missing
+            }
+        if healthy:
+            print(f"✅ Ollama reachable on {len(healthy)}/{len(registry)} backends")
+        else:
+            print("⚠️ No Ollama backend answered the startup probe. Make sure Ollama is running")
+        for model in missing:
+            print(f"⚠️ Model {model} is not available on any backend. Please ensure it's pulled.")
+
+    def _expects_traffic(self, model):
+        last = self.client.backends.last_used.get(model) or self._started_at
+        return time.time() - last < self.traffic_window
+
+    def warm(self, models):
+        """Load models on every healthy backend that has them, then refresh residency"""
+        registry = self.client.backends
+        registry.check_all()
+        for model in models:
+            for backend in registry.backends:
+                if not backend.healthy or not backend.serves(model):
+                    continue
+                try:
+                    self.client.load_model(model, backend, self.keep_alive, self.warmup_timeout)
+                    with self._lock:
+                        self.loads += 1
+                except LLMError as e:
+                    print(f"⚠️ Could not load {model} on {backend.host}: {str(e)}")
+                    with self._lock:
+                        self.failures += 1
+                        self.last_error = str(e)
+        registry.check_all()
+        with self._lock:
+            self._warmed_at = time.time()
+
+    def resident(self):
+        """Hosts each registered model is currently loaded on"""
+        registry = self.client.backends
+        return {
+            model: [b.host for b in registry.backends if b.healthy and model in b.loaded]
+            for model in sorted(self.models)
+        }
+
+    def ready(self):
+        """Whether the first warm-up has run and every registered model is resident somewhere"""
+        return self._warmed_at is not None and all(self.resident().values())
+
+    def stats(self):
+        """Probe result, warm-up state and residency per model, for readiness checks and monitoring"""
+        with self._lock:
+            warmed_at, loads, failures, last_error = self._warmed_at, self.loads, self.failures, self.last_error
+            probe = dict(self._probe) if self._probe else None
+        return {
+            "ready": self.ready(),
+            "probe": probe,
+            "warmed": round(time.time() - warmed_at, 1) if warmed_at else None,
+            "keep_alive": self.keep_alive,
+            "loads": loads,
+            "failures": failures,
+            "last_error": last_error,
+            "models": self.resident()
+        }
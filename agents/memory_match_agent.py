@@ -1,71 +1,23 @@
-import json
 import os
 import time
 import sys
-import subprocess
 import random
+from llm_client import get_llm_client
 
 class MemoryMatchAgent:
     def __init__(self):
         self.model = "mistral:latest"
+        self.llm = get_llm_client()
+        self.llm.warmup.register(self.model)
         print(f"🎮 Initializing MemoryMatchAgent with model: {self.model}")
-        self._check_ollama_status()
         
-    def _check_ollama_status(self):
-        """Check Ollama status without making actual API calls"""
-        print("🔍 Checking Ollama installation for Memory Match Agent")
-        try:
-            result = subprocess.run(
-                ['ollama', 'list'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                output = result.stdout.decode('utf-8')
-                print(f"✅ Ollama is installed and running")
-                
-                if self.model not in output:
-                    print(f"⚠️ Model {self.model} might not be available. Please ensure it's pulled.")
-                else:
-                    print(f"✅ Model {self.model} appears to be available")
-            else:
-                error = result.stderr.decode('utf-8')
-                print(f"⚠️ Warning: Ollama CLI returned error: {error}")
-        except Exception as e:
-            print(f"⚠️ Warning: Error checking Ollama status: {str(e)}")
-            print(f"⚠️ Make sure Ollama is installed and in your PATH")
-    
-    def ollama_generate(self, prompt):
-        """Generate a response using Ollama CLI"""
-        try:
-            print(f"🔄 Calling Ollama CLI with model {self.model} for memory match content")
-            
-            # Call Ollama CLI
-            result = subprocess.run(
-                ['ollama', 'run', self.model],
-                input=prompt.encode('utf-8'),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=120
-            )
-            
-            if result.returncode == 0:
-                response = result.stdout.decode('utf-8').strip()
-                print(f"✅ Generated memory match content ({len(response)} chars)")
-                return response
-            else:
-                error = result.stderr.decode('utf-8')
-                print(f"❌ Ollama CLI error: {error}")
-                return f"I'm sorry, I encountered an issue while generating game content. Error: {error}"
-                
-        except subprocess.TimeoutExpired:
-            print("❌ Ollama process timed out after 120 seconds")
-            return "I'm sorry, it's taking longer than expected to generate content. Please try again."
-        except Exception as e:
-            print(f"❌ Error calling Ollama: {str(e)}")
-            return f"I'm sorry, I'm having trouble connecting to the language model. Error: {str(e)}"
+    def ollama_generate_json(self, prompt):
+        """Generate memory match content as JSON validated against the memory_match schema; raises LLMError on failure"""
+        print(f"🔄 Calling Ollama API with model {self.model} for memory match content")
+        
+        content = self.llm.generate_json(self.model, prompt, "memory_match")
+        print(f"✅ Generated memory match content")
+        return content
     
     def generate_card_pairs(self, difficulty="medium", theme="mindfulness"):
         """Generate card pairs for the memory match game"""
@@ -98,33 +50,21 @@ For medium difficulty, generate 8 pairs (16 cards total).
 For hard difficulty, generate 12 pairs (24 cards total).
 """
         try:
-            response = self.ollama_generate(prompt)
-            # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                content = json.loads(json_str)
-                
-                # Ensure we have all required fields
-                if not all(key in content for key in ["pairs", "difficulty", "theme", "title", "description"]):
-                    raise ValueError("Missing required fields in generated content")
-                
-                # Ensure we have enough pairs based on difficulty
-                required_pairs = 6  # default for easy
-                if difficulty == "medium":
-                    required_pairs = 8
-                elif difficulty == "hard":
-                    required_pairs = 12
-                
-                if len(content["pairs"]) < required_pairs:
-                    # Add default pairs if needed
-                    content["pairs"].extend(self._get_default_pairs(required_pairs - len(content["pairs"])))
-                
-                return content
-            else:
-                # If JSON parsing fails, create a default response
-                return self._get_default_card_pairs(difficulty, theme)
+            # Required fields are enforced by the memory_match schema
+            content = self.ollama_generate_json(prompt)
+            
+            # Ensure we have enough pairs based on difficulty
+            required_pairs = 6  # default for easy
+            if difficulty == "medium":
+                required_pairs = 8
+            elif difficulty == "hard":
+                required_pairs = 12
+            
+            if len(content["pairs"]) < required_pairs:
+                # Add default pairs if needed
+                content["pairs"].extend(self._get_default_pairs(required_pairs - len(content["pairs"])))
+            
+            return content
         except Exception as e:
             print(f"❌ Error generating memory match content: {str(e)}")
             return self._get_default_card_pairs(difficulty, theme)
@@ -2,13 +2,15 @@ import json
 import time
 import random
 import traceback
-import requests
 from typing import Dict, List, Any, Optional
+from llm_client import get_llm_client, LLMError, LLMTimeoutError
+from lexicon_classifier import EMOTION_LEXICON, THEME_LEXICON
 
 class ReportAgent:
     def __init__(self):
-        self.api_url = "http://localhost:11434/api/generate"
         self.model = "llama3"
+        self.llm = get_llm_client()
+        self.llm.warmup.register(self.model)
         print(f"🔍 ReportAgent initialized with model: {self.model}")
 
     def generate_combined_report(self, chat_history, journal_data, user_id):
@@ -83,57 +85,35 @@ class ReportAgent:
             
             # Call the LLM to generate the analysis
             try:
-                response = requests.post(
-                    self.api_url,
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "top_p": 0.9,
-                            "max_tokens": 2000
-                        }
-                    },
-                    timeout=30  # Add a timeout to prevent hanging
-                )
+                # Sampling options, token budget and the 30 second timeout
+                # come from the "report" generation profile
+                llm_text = self.llm.generate(self.model, prompt, agent="report")
                 
-                if response.status_code != 200:
-                    print(f"❌ LLM API error: {response.status_code}")
-                    print(f"❌ Response: {response.text}")
-                    
-                    # Fallback to a simpler analysis based on the extracted data
-                    print(f"⚠️ Using fallback analysis generation")
-                    analysis_result = self._generate_fallback_analysis(emotion_counts, theme_counts, mood_counts)
+                print(f"✅ LLM response received (length: {len(llm_text)} characters)")
+                
+                # Log a truncated version of the response
+                max_response_log_length = 500
+                if len(llm_text) > max_response_log_length:
+                    print(f"📌 Response preview (first {max_response_log_length} chars):")
+                    print(f"{llm_text[:max_response_log_length]}...")
                 else:
-                    # Parse the LLM response
-                    llm_response = response.json()
-                    llm_text = llm_response.get("response", "")
-                    
-                    print(f"✅ LLM response received (length: {len(llm_text)} characters)")
-                    
-                    # Log a truncated version of the response
-                    max_response_log_length = 500
-                    if len(llm_text) > max_response_log_length:
-                        print(f"📌 Response preview (first {max_response_log_length} chars):")
-                        print(f"{llm_text[:max_response_log_length]}...")
-                    else:
-                        print(f"📌 Full response:")
-                        print(f"{llm_text}")
-                    
-                    # Try to extract JSON from the response
-                    analysis_result = self._extract_json_from_text(llm_text)
-                    
-                    # If extraction failed, use the fallback
-                    if not analysis_result:
-                        print(f"⚠️ Could not extract valid JSON from LLM response, using fallback")
-                        analysis_result = self._generate_fallback_analysis(emotion_counts, theme_counts, mood_counts)
+                    print(f"📌 Full response:")
+                    print(f"{llm_text}")
+                
+                # Try to extract JSON from the response
+                analysis_result = self._extract_json_from_text(llm_text)
+                
+                # If extraction failed, use the fallback
+                if not analysis_result:
+                    print(f"⚠️ Could not extract valid JSON from LLM response, using fallback")
+                    analysis_result = self._generate_fallback_analysis(emotion_counts, theme_counts, mood_counts)
             
-            except requests.exceptions.Timeout:
+            except LLMTimeoutError:
                 print(f"❌ LLM API timeout after 30 seconds")
                 analysis_result = self._generate_fallback_analysis(emotion_counts, theme_counts, mood_counts)
-            except requests.exceptions.RequestException as e:
-                print(f"❌ LLM API request error: {str(e)}")
+            except LLMError as e:
+                print(f"❌ LLM API error: {str(e)}")
+                print(f"⚠️ Using fallback analysis generation")
                 analysis_result = self._generate_fallback_analysis(emotion_counts, theme_counts, mood_counts)
             except Exception as e:
                 print(f"❌ Unexpected error calling LLM: {str(e)}")
@@ -351,26 +331,11 @@ class ReportAgent:
         # This is a simplified implementation
         # In a real-world scenario, you would use NLP or ML models
         
-        emotion_keywords = {
-            "happy": ["happy", "joy", "delighted", "pleased", "content", "satisfied"],
-            "sad": ["sad", "unhappy", "depressed", "down", "blue", "gloomy"],
-            "angry": ["angry", "mad", "furious", "irritated", "annoyed", "frustrated"],
-            "anxious": ["anxious", "worried", "nervous", "uneasy", "concerned", "stressed"],
-            "calm": ["calm", "peaceful", "relaxed", "serene", "tranquil", "composed"],
-            "excited": ["excited", "thrilled", "enthusiastic", "eager", "animated"],
-            "tired": ["tired", "exhausted", "fatigued", "drained", "sleepy"],
-            "grateful": ["grateful", "thankful", "appreciative", "blessed"],
-            "confused": ["confused", "puzzled", "perplexed", "uncertain", "unsure"],
-            "hopeful": ["hopeful", "optimistic", "positive", "encouraged"],
-            "overwhelmed": ["overwhelmed", "swamped", "overloaded", "burdened"],
-            "proud": ["proud", "accomplished", "satisfied", "fulfilled"]
-        }
-        
         # Count occurrences of emotion keywords
         emotion_counts = {}
         text_lower = text.lower()
         
-        for emotion, keywords in emotion_keywords.items():
+        for emotion, keywords in EMOTION_LEXICON.items():
             count = 0
             for keyword in keywords:
                 count += text_lower.count(keyword)
@@ -388,26 +353,11 @@ class ReportAgent:
         # This is a simplified implementation
         # In a real-world scenario, you would use NLP or ML models
         
-        theme_keywords = {
-            "work": ["work", "job", "career", "office", "professional", "colleague"],
-            "relationships": ["relationship", "friend", "family", "partner", "spouse", "love"],
-            "health": ["health", "wellness", "exercise", "diet", "sleep", "medical"],
-            "personal growth": ["growth", "improvement", "learning", "development", "progress"],
-            "stress": ["stress", "pressure", "tension", "overwhelm", "burnout"],
-            "self-care": ["self-care", "relax", "rest", "recharge", "break", "me time"],
-            "mindfulness": ["mindful", "present", "aware", "conscious", "meditation"],
-            "goals": ["goal", "objective", "target", "aim", "aspiration", "achievement"],
-            "creativity": ["creative", "art", "write", "music", "express", "imagination"],
-            "balance": ["balance", "harmony", "equilibrium", "stability"],
-            "change": ["change", "transition", "shift", "adjust", "adapt"],
-            "gratitude": ["gratitude", "thankful", "appreciate", "blessing"]
-        }
-        
         # Count occurrences of theme keywords
         theme_counts = {}
         text_lower = text.lower()
         
-        for theme, keywords in theme_keywords.items():
+        for theme, keywords in THEME_LEXICON.items():
             count = 0
             for keyword in keywords:
                 count += text_lower.count(keyword)
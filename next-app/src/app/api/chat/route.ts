@@ -3,10 +3,24 @@ import prisma from "@/app/db/prisma";
 import { MessageRole } from "@prisma/client";
 import { authenticateUser } from "@/app/lib/auth-utils";
 
+const AGENT_CHAT_URL = "http://localhost:4000/api/chat";
+
+// The Flask backend keeps each session's history itself; we only send the
+// new message and how many messages the session had before it (the cursor)
+async function callChatAgent(body: Record<string, unknown>) {
+  return fetch(AGENT_CHAT_URL, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(body),
+  });
+}
+
 export async function POST(req: Request) {
   try {
     const requestBody = await req.json();
-    const { message, sessionId, chatHistory } = requestBody;
+    const { message, sessionId } = requestBody;
 
     // Authenticate the user
     const auth = await authenticateUser(requestBody);
@@ -50,6 +64,11 @@ export async function POST(req: Request) {
       }
     }
 
+    // Messages the backend should already hold for this session
+    const cursor = await prisma.message.count({
+      where: { chatSessionId },
+    });
+
     // Save the user message to the database
     const userMessage = await prisma.message.create({
       data: {
@@ -61,62 +80,42 @@ export async function POST(req: Request) {
 
     console.log(`[AI Agent] Saved user message: ${userMessage.id}`);
 
-    // Fetch all user's chat history across all sessions
-    const allUserSessions = await prisma.chatSession.findMany({
-      where: {
-        userId,
-      },
-      include: {
-        messages: {
-          orderBy: {
-            createdAt: "asc",
-          },
-        },
-      },
-      orderBy: {
-        updatedAt: "desc",
-      },
-      take: 10, // Limit to most recent 10 sessions to avoid context overflow
+    // Call the Python Flask backend
+    let response = await callChatAgent({
+      message,
+      sessionId: chatSessionId,
+      userId,
+      cursor,
     });
 
-    // Flatten all messages from all sessions into a single history
-    const allUserMessages = allUserSessions.flatMap((session) =>
-      session.messages.map((msg) => ({
-        role: msg.role,
-        content: msg.content,
-        sessionId: session.id,
-        createdAt: msg.createdAt,
-      }))
-    );
-
-    // Sort all messages by creation time
-    allUserMessages.sort(
-      (a, b) => a.createdAt.getTime() - b.createdAt.getTime()
-    );
+    // The backend's copy of the session is missing or stale (e.g. a fresh
+    // conversation store): send this session's history once to reseed it
+    if (response.status === 409) {
+      const history = await prisma.message.findMany({
+        where: {
+          chatSessionId,
+          id: { not: userMessage.id },
+        },
+        orderBy: {
+          createdAt: "asc",
+        },
+        select: {
+          role: true,
+          content: true,
+        },
+      });
 
-    // Limit to most recent 50 messages to avoid context overflow
-    const recentUserMessages = allUserMessages.slice(-50);
+      console.log(
+        `[AI Agent] Backend out of sync, resending ${history.length} messages`
+      );
 
-    console.log(
-      `[AI Agent] Including ${recentUserMessages.length} messages from user's history`
-    );
-
-    // Call the Python Flask backend
-    const response = await fetch("http://localhost:4000/api/chat", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
+      response = await callChatAgent({
         message,
         sessionId: chatSessionId,
         userId,
-        chatHistory: recentUserMessages.map((msg) => ({
-          role: msg.role,
-          content: msg.content,
-        })),
-      }),
-    });
+        chatHistory: history,
+      });
+    }
 
     if (!response.ok) {
       throw new Error(`Flask API returned ${response.status}`);
@@ -768,11 +768,6 @@ export default function AICompanion() {
     setTranscriptionComplete(false);
 
     try {
-      const fullChatHistory = [...messages, userMessage].map((msg) => ({
-        role: msg.role,
-        content: msg.content,
-      }));
-
       const response = await fetch("/api/chat", {
         method: "POST",
         headers: {
@@ -783,7 +778,6 @@ export default function AICompanion() {
           sessionId: sessionId || "new-chat",
           // @ts-ignore
           userId: session.user.id,
-          chatHistory: fullChatHistory,
         }),
       });
 